@@ -0,0 +1,202 @@
+# cache_compresion.py
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+from contextlib import contextmanager
+
+from utilidades import obtener_tamano_archivo, crear_directorio_si_no_existe, salida_atomica
+
+# Directorio por defecto de la caché, compartido entre la interfaz y la consola
+DIRECTORIO_CACHE = os.path.join(os.path.expanduser("~"), ".cache", "compresor_archivos")
+TAMANO_MAXIMO_CACHE = 512 * 1024 * 1024
+# Cambiarla invalida todas las entradas guardadas
+VERSION_CACHE = 2
+TAMANO_LECTURA_HASH = 1024 * 1024
+# Al superar el tamaño máximo se descartan entradas hasta quedar en esta
+# fracción, para no tener que recorrer el directorio en cada guardado
+FRACCION_TRAS_DESCARTE = 0.9
+
+EXTENSION_ARTEFACTO = ".dat"
+EXTENSION_METADATOS = ".json"
+
+registro = logging.getLogger(__name__)
+
+
+@contextmanager
+def compresion_con_cache(cache, archivo_entrada, archivo_salida, compresor, **parametros):
+    """
+    Envuelve una compresión con la caché. Al entrar busca el resultado y
+    entrega True si ya quedó copiado en archivo_salida, para que quien llama
+    devuelva sin comprimir; si no, entrega False y al salir sin errores
+    guarda el archivo comprimido con el tiempo que llevó. Con `cache` None
+    siempre entrega False.
+    """
+    if cache is None:
+        yield False
+        return
+    clave = cache.clave(archivo_entrada, compresor, **parametros)
+    if cache.recuperar(clave, archivo_salida) is not None:
+        yield True
+        return
+    inicio = time.perf_counter()
+    yield False
+    cache.guardar(clave, archivo_entrada, archivo_salida, time.perf_counter() - inicio)
+
+
+class CacheCompresion:
+    """
+    Caché persistente de resultados de compresión. Cada entrada se identifica
+    por el hash del contenido del archivo de entrada junto con el compresor y
+    sus parámetros, y guarda el archivo comprimido y sus estadísticas.
+
+    Cada entrada son dos archivos en el directorio: el artefacto (.dat) y sus
+    metadatos (.json). La fecha de modificación de los metadatos marca el
+    último uso; al superar `tamano_maximo` bytes se descartan las entradas
+    usadas hace más tiempo. Las escrituras son atómicas, así que varios
+    procesos pueden compartir el mismo directorio.
+
+    El tamaño ocupado se recorre una vez y después se lleva como un total
+    que suma lo que guarda esta instancia; el directorio se vuelve a
+    recorrer solo al descartar. Lo que agregan otros procesos se nota
+    recién en ese recorrido, así que con varios procesos el tamaño puede
+    pasarse del máximo por un rato.
+    """
+    def __init__(self, directorio=DIRECTORIO_CACHE, tamano_maximo=TAMANO_MAXIMO_CACHE):
+        self.directorio = directorio
+        self.tamano_maximo = tamano_maximo
+        # Estadísticas de la última entrada recuperada (None si la última consulta falló)
+        self.ultimo_acierto = None
+        # Bytes ocupados según el último recorrido más lo guardado desde entonces
+        self._tamano_total = None
+        crear_directorio_si_no_existe(directorio)
+
+    def clave(self, archivo, compresor, **parametros):
+        """Hash del contenido de `archivo`, del compresor y de los parámetros"""
+        try:
+            resumen = hashlib.sha256()
+            descripcion = json.dumps([VERSION_CACHE, compresor, parametros], sort_keys=True, default=str)
+            resumen.update(descripcion.encode('utf-8'))
+            with open(archivo, 'rb') as entrada:
+                while True:
+                    bloque = entrada.read(TAMANO_LECTURA_HASH)
+                    if not bloque:
+                        break
+                    resumen.update(bloque)
+            return resumen.hexdigest()
+        except Exception as e:
+            raise Exception(f"Error calculando la clave de caché: {e}")
+
+    def recuperar(self, clave, archivo_salida):
+        """
+        Si la clave está en la caché copia el artefacto a archivo_salida y
+        devuelve sus estadísticas; si no, devuelve None
+        """
+        self.ultimo_acierto = None
+        ruta_metadatos = self._ruta(clave, EXTENSION_METADATOS)
+        try:
+            with open(ruta_metadatos, 'r', encoding='utf-8') as archivo:
+                estadisticas = json.load(archivo)
+            shutil.copyfile(self._ruta(clave, EXTENSION_ARTEFACTO), archivo_salida)
+            os.utime(ruta_metadatos)
+        except (OSError, ValueError):
+            # Entrada inexistente, a medio escribir o descartada por otro proceso
+            return None
+        self.ultimo_acierto = estadisticas
+        return estadisticas
+
+    def guardar(self, clave, archivo_entrada, archivo_salida, segundos):
+        """
+        Guarda archivo_salida como resultado de la clave y descarta entradas
+        viejas si hace falta. La caché es opcional: si no se puede escribir
+        se avisa en el registro y se devuelve None, sin afectar la compresión
+        que ya terminó.
+        """
+        try:
+            tamano_original = obtener_tamano_archivo(archivo_entrada)
+            tamano_comprimido = obtener_tamano_archivo(archivo_salida)
+            if tamano_comprimido > self.tamano_maximo:
+                return None
+            estadisticas = {
+                'archivo': os.path.basename(archivo_entrada),
+                'tamano_original': tamano_original,
+                'tamano_comprimido': tamano_comprimido,
+                'razon': tamano_comprimido / tamano_original if tamano_original else 0.0,
+                'segundos': segundos,
+            }
+            ruta_artefacto = self._ruta(clave, EXTENSION_ARTEFACTO)
+            tamano_anterior = obtener_tamano_archivo(ruta_artefacto)
+            # El artefacto va primero: los metadatos solo existen si está completo
+            with salida_atomica(ruta_artefacto) as temporal:
+                shutil.copyfile(archivo_salida, temporal)
+            with salida_atomica(self._ruta(clave, EXTENSION_METADATOS)) as temporal:
+                self._escribir_json(temporal, estadisticas)
+            self._sumar_tamano(tamano_comprimido - tamano_anterior)
+            return estadisticas
+        except Exception as e:
+            registro.warning("No se pudo guardar en la caché de %s: %s", self.directorio, e)
+            return None
+
+    def tamano(self):
+        """Bytes ocupados por los artefactos de la caché"""
+        return sum(tamano for _, _, tamano in self._entradas())
+
+    def vaciar(self):
+        """Elimina todas las entradas"""
+        for clave, _, _ in self._entradas():
+            self._eliminar(clave)
+        self._tamano_total = 0
+
+    def _ruta(self, clave, extension):
+        return os.path.join(self.directorio, clave + extension)
+
+    def _escribir_json(self, ruta, datos):
+        with open(ruta, 'w', encoding='utf-8') as archivo:
+            json.dump(datos, archivo)
+
+    def _entradas(self):
+        """Genera (clave, último uso, tamaño del artefacto) de cada entrada"""
+        for nombre in os.listdir(self.directorio):
+            clave, extension = os.path.splitext(nombre)
+            if extension != EXTENSION_METADATOS:
+                continue
+            try:
+                ultimo_uso = os.path.getmtime(self._ruta(clave, EXTENSION_METADATOS))
+                tamano = os.path.getsize(self._ruta(clave, EXTENSION_ARTEFACTO))
+            except OSError:
+                continue
+            yield clave, ultimo_uso, tamano
+
+    def _sumar_tamano(self, bytes_agregados):
+        """Actualiza el total ocupado y descarta entradas si supera el máximo"""
+        if self._tamano_total is None:
+            self._tamano_total = self.tamano()
+        else:
+            self._tamano_total += bytes_agregados
+        if self._tamano_total > self.tamano_maximo:
+            self._descartar_viejas()
+
+    def _descartar_viejas(self):
+        """
+        Elimina las entradas usadas hace más tiempo hasta bajar a
+        FRACCION_TRAS_DESCARTE del tamaño máximo, y corrige el total
+        """
+        entradas = sorted(self._entradas(), key=lambda entrada: entrada[1])
+        total = sum(tamano for _, _, tamano in entradas)
+        objetivo = self.tamano_maximo * FRACCION_TRAS_DESCARTE
+        for clave, _, tamano in entradas:
+            if total <= objetivo:
+                break
+            self._eliminar(clave)
+            total -= tamano
+        self._tamano_total = total
+
+    def _eliminar(self, clave):
+        # Los metadatos primero, para que nadie encuentre una entrada sin artefacto
+        for extension in (EXTENSION_METADATOS, EXTENSION_ARTEFACTO):
+            try:
+                os.remove(self._ruta(clave, extension))
+            except OSError:
+                pass
@@ -1,60 +1,555 @@
 # compresor_audio.py
 import wave
-import struct
+import contextlib
+import itertools
 import os
+import struct
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+from cache_compresion import compresion_con_cache
+from flujo_bits import desempaquetar_codigos, empaquetar_codigos
+from progreso import FASE_CODIFICANDO, FASE_DECODIFICANDO, NotificadorProgreso, OperacionCancelada
+from utilidades import (mapear_en_orden, obtener_tamano_archivo, formatear_tamano, ruta_base_salida,
+                        salida_atomica)
+
+# Frames que se leen, procesan y escriben por bloque. En los modos sin
+# pérdida y ADPCM cada canal de un bloque es una tarea del grupo de procesos.
+FRAMES_POR_BLOQUE = 1 << 16
+
+# Modos de compresión de WAV
+MODO_REDUCCION = "reduccion"      # cuantización simple, salida WAV del mismo tamaño
+MODO_SIN_PERDIDA = "sin_perdida"  # predicción lineal + códigos de Rice, salida .lac
+MODO_PROFUNDIDAD = "profundidad"  # menos bits por muestra, salida WAV más angosta
+MODO_ADPCM = "adpcm"              # IMA-ADPCM de 2 a 5 bits por muestra, salida .adp (el más lento)
+SUFIJOS_SALIDA = {
+    MODO_REDUCCION: "_comprimido.wav",
+    MODO_SIN_PERDIDA: "_comprimido.lac",
+    MODO_PROFUNDIDAD: "_comprimido.wav",
+    MODO_ADPCM: "_comprimido.adp",
+}
+
+# Formato .lac (sin pérdida):
+#   encabezado | bloques
+#   bloque = decorrelación estéreo | una subtrama por canal
+#   subtrama = orden, k | muestras iniciales | flujo unario | bits bajos
+MAGIA_SIN_PERDIDA = b"LAC"
+VERSION_SIN_PERDIDA = 1
+# magia, versión, canales, bytes por muestra, frecuencia, total de frames, frames por bloque
+FORMATO_ENCABEZADO_LAC = "<3sBHBIQI"
+# decorrelación estéreo del bloque
+FORMATO_BLOQUE_LAC = "<B"
+# orden del predictor, parámetro de Rice, bytes del flujo unario, bytes de los bits bajos
+FORMATO_SUBTRAMA = "<BBII"
+FRAMES_POR_BLOQUE_SIN_PERDIDA = 4096
+# Predictores polinómicos fijos de orden 0 a 4 (como las subtramas fijas de FLAC)
+ORDEN_MAXIMO = 4
+# Decorrelación estéreo: qué par de señales se codifica en cada bloque
+ESTEREO_INDEPENDIENTE = 0  # izquierdo, derecho
+ESTEREO_IZQUIERDO_LATERAL = 1  # izquierdo, izquierdo - derecho
+ESTEREO_LATERAL_DERECHO = 2  # izquierdo - derecho, derecho
+ESTEREO_MEDIO_LATERAL = 3  # (izquierdo + derecho) >> 1, izquierdo - derecho
+
+# Bits por muestra por defecto de los modos con pérdida
+BITS_PROFUNDIDAD = 8
+BITS_ADPCM = 4
+
+# Formato .adp (IMA-ADPCM):
+#   encabezado | bloques
+#   bloque = frames | predictor e índice de cada canal | códigos empaquetados de cada canal
+# La primera muestra de cada canal va en el predictor, así que cada bloque
+# se decodifica sin depender de los anteriores.
+# Cada muestra depende del predictor y del paso que dejó la anterior, así que
+# las muestras de un canal se recorren una por una en Python, con el
+# cuantizador precalculado en tablas. Por eso este modo tarda unas tres veces
+# lo que el sin pérdida al comprimir y más del doble al descomprimir; solo se
+# acelera repartiendo canales y bloques en el grupo de procesos.
+MAGIA_ADPCM = b"ADP"
+VERSION_ADPCM = 1
+# magia, versión, canales, bits por código, frecuencia, total de frames
+FORMATO_ENCABEZADO_ADPCM = "<3sBHBIQ"
+FORMATO_BLOQUE_ADPCM = "<I"
+# predictor (muestra de 16 bits) e índice en la tabla de pasos
+FORMATO_CANAL_ADPCM = "<hB"
+FRAMES_POR_BLOQUE_ADPCM = 4096
+PASOS_IMA = [
+    7, 8, 9, 10, 11, 12, 13, 14, 16, 17, 19, 21, 23, 25, 28, 31, 34, 37, 41, 45,
+    50, 55, 60, 66, 73, 80, 88, 97, 107, 118, 130, 143, 157, 173, 190, 209, 230,
+    253, 279, 307, 337, 371, 408, 449, 494, 544, 598, 658, 724, 796, 876, 963,
+    1060, 1166, 1282, 1411, 1552, 1707, 1878, 2066, 2272, 2499, 2749, 3024, 3327,
+    3660, 4026, 4428, 4871, 5358, 5894, 6484, 7132, 7845, 8630, 9493, 10442,
+    11487, 12635, 13899, 15289, 16818, 18500, 20350, 22385, 24623, 27086, 29794,
+    32767,
+]
+# Ajuste del índice de paso según la magnitud del código, por bits por código
+TABLAS_INDICE_ADPCM = {
+    2: [-1, 2],
+    3: [-1, -1, 1, 2],
+    4: [-1, -1, -1, -1, 2, 4, 6, 8],
+    5: [-1, -1, -1, -1, -1, -1, -1, -1, 1, 2, 4, 6, 8, 10, 13, 16],
+}
+# Transiciones del cuantizador ya calculadas en este proceso, por bits por
+# código (ver CompresorAudio._transiciones_adpcm)
+_transiciones_adpcm = {}
+
+# Filtro antialias del diezmado: coeficientes por unidad de factor y
+# fracción de la nueva frecuencia de Nyquist que se conserva
+COEFICIENTES_POR_FACTOR = 32
+BANDA_PASANTE = 0.9
 
 class CompresorAudio:
-    def __init__(self):
-        pass
+    def __init__(self, cache=None):
+        # CacheCompresion opcional: si el WAV ya se comprimió igual se reutiliza
+        self.cache = cache
     
-    def comprimir(self, archivo_audio):
+    def comprimir(self, archivo_audio, modo=MODO_REDUCCION, bits=None, factor_muestreo=1, procesos=None,
+                  progreso=None, directorio_salida=None):
         """
-        Comprime audio usando una técnica simple de compresión
+        Comprime audio. Los WAV se comprimen reduciendo la calidad o, en modo
+        sin pérdida, con predicción lineal y códigos de Rice.
+        
+        En los modos con pérdida `bits` fija los bits por muestra de la salida
+        (8, 16 o 24 en modo profundidad; 2 a 5 en modo ADPCM) y
+        `factor_muestreo` divide la frecuencia de muestreo, filtrando antes
+        las frecuencias que ya no se pueden representar.
+        
+        Los modos sin pérdida y ADPCM separan los canales y codifican cada
+        canal de cada bloque en un grupo de `procesos` procesos (por defecto
+        uno por núcleo). La función `progreso` recibe EventoProgreso con los
+        bytes de audio leídos. La salida se escribe junto al original o en
+        `directorio_salida`.
         """
         try:
-            # Para WAV - compresión real con reducción de calidad
+            notificador = NotificadorProgreso(progreso)
+            # Para WAV - compresión real con reducción de calidad o sin pérdida
             if archivo_audio.lower().endswith('.wav'):
-                return self._comprimir_wav(archivo_audio)
+                if not isinstance(factor_muestreo, int) or factor_muestreo < 1:
+                    raise ValueError("El factor de muestreo debe ser un entero mayor o igual a 1")
+                if modo not in SUFIJOS_SALIDA:
+                    raise ValueError(f"Modo de compresión de audio desconocido: {modo}")
+                if modo == MODO_SIN_PERDIDA and factor_muestreo != 1:
+                    raise ValueError("El modo sin pérdida no admite cambiar la frecuencia de muestreo")
+                archivo_salida = ruta_base_salida(archivo_audio, directorio_salida) + SUFIJOS_SALIDA[modo]
+                
+                with compresion_con_cache(self.cache, archivo_audio, archivo_salida, "audio", modo=modo,
+                                          bits=bits, factor_muestreo=factor_muestreo,
+                                          version=(VERSION_SIN_PERDIDA, VERSION_ADPCM)) as en_cache:
+                    if en_cache:
+                        return archivo_salida
+                    
+                    with salida_atomica(archivo_salida) as temporal:
+                        if modo == MODO_REDUCCION:
+                            self._comprimir_wav(archivo_audio, temporal, factor_muestreo, notificador)
+                        elif modo == MODO_SIN_PERDIDA:
+                            self._comprimir_sin_perdida(archivo_audio, temporal, procesos, notificador)
+                        elif modo == MODO_PROFUNDIDAD:
+                            self._comprimir_profundidad(archivo_audio, temporal, bits or BITS_PROFUNDIDAD,
+                                                        factor_muestreo, notificador)
+                        else:
+                            self._comprimir_adpcm(archivo_audio, temporal, bits or BITS_ADPCM, factor_muestreo,
+                                                  procesos, notificador)
+                    
+                return archivo_salida
             
             # Para MP3 - no podemos comprimir MP3, entonces hacemos una "simulación"
             elif archivo_audio.lower().endswith('.mp3'):
-                return self._simular_compresion_mp3(archivo_audio)
+                return self._simular_compresion_mp3(archivo_audio, directorio_salida)
             
             else:
                 raise ValueError("Formato de audio no soportado. Use .wav o .mp3")
             
+        except OperacionCancelada:
+            raise
         except Exception as e:
             raise Exception(f"Error en compresión de audio: {e}")
     
-    def _comprimir_wav(self, archivo_audio):
-        """Comprime archivo WAV real reduciendo la calidad"""
+    def _comprimir_wav(self, archivo_audio, archivo_salida, factor_muestreo, notificador):
+        """
+        Comprime archivo WAV real reduciendo la calidad, bloque a bloque para
+        que la memoria no dependa de la duración del audio
+        """
         try:
+            # Crear archivo WAV comprimido (REPRODUCIBLE)
             with wave.open(archivo_audio, 'rb') as audio:
                 params = audio.getparams()
-                frames = audio.readframes(params.nframes)
+                notificador.fase(FASE_CODIFICANDO, params.nframes * params.nchannels * params.sampwidth)
+                with self._abrir_wav_salida(archivo_salida, params.nchannels, params.sampwidth,
+                                            params.framerate // factor_muestreo,
+                                            -(-params.nframes // factor_muestreo)) as salida:
+                    for muestras in self._bloques_muestras(audio, notificador, factor_muestreo):
+                        # Aplicar compresión reduciendo la resolución
+                        muestras_comprimidas = self._comprimir_muestras(muestras.reshape(-1))
+                        
+                        salida.writeframes(self._muestras_a_frames(muestras_comprimidas,
+                                                                   params.sampwidth))
+            notificador.terminar()
+            
+            return archivo_salida
+            
+        except OperacionCancelada:
+            raise
+        except Exception as e:
+            raise Exception(f"Error comprimiendo WAV: {e}")
+    
+    def _comprimir_sin_perdida(self, archivo_audio, archivo_salida, procesos, notificador):
+        """
+        Comprime un WAV sin pérdida: por cada bloque elige la decorrelación
+        estéreo y el predictor fijo más baratos y codifica los residuos con
+        códigos de Rice
+        """
+        try:
+            procesos = procesos or os.cpu_count() or 1
             
-            # Convertir frames a lista de muestras
-            muestras = self._frames_a_muestras(frames, params.sampwidth)
+            with wave.open(archivo_audio, 'rb') as audio, open(archivo_salida, 'wb') as salida, \
+                    self._grupo_procesos(procesos) as ejecutor:
+                params = audio.getparams()
+                notificador.fase(FASE_CODIFICANDO, params.nframes * params.nchannels * params.sampwidth)
+                salida.write(struct.pack(FORMATO_ENCABEZADO_LAC, MAGIA_SIN_PERDIDA, VERSION_SIN_PERDIDA,
+                                         params.nchannels, params.sampwidth, params.framerate,
+                                         params.nframes, FRAMES_POR_BLOQUE_SIN_PERDIDA))
+                
+                # Las decorrelaciones de cada bloque esperan aquí a que
+                # lleguen las subtramas de sus canales
+                decorrelaciones = deque()
+                
+                def tareas():
+                    for muestras in self._bloques_muestras(audio, notificador):
+                        codigos, senales = self._decorrelacionar_bloque(muestras.astype(np.int64))
+                        decorrelaciones.append(codigos)
+                        yield from senales
+                
+                resultados = self._mapear(ejecutor, _codificar_canal_sin_perdida, tareas(), 2 * procesos)
+                for subtramas in self._agrupar(resultados, params.nchannels):
+                    salida.write(self._intercalar_subtramas(decorrelaciones.popleft(), subtramas))
+            notificador.terminar()
             
-            # Aplicar compresión reduciendo la resolución
-            muestras_comprimidas = self._comprimir_muestras(muestras)
+            return archivo_salida
             
-            # Crear archivo WAV comprimido (REPRODUCIBLE)
-            nombre_base = os.path.splitext(archivo_audio)[0]
-            archivo_salida = nombre_base + "_comprimido.wav"
+        except OperacionCancelada:
+            raise
+        except Exception as e:
+            raise Exception(f"Error comprimiendo WAV sin pérdida: {e}")
+    
+    def _decorrelacionar_bloque(self, muestras):
+        """
+        Separa un bloque (frames, canales) en una señal contigua por canal. En
+        estéreo elige además la decorrelación de cada subtrama; devuelve los
+        códigos de decorrelación y las señales a codificar.
+        """
+        senales = [np.ascontiguousarray(muestras[:, canal]) for canal in range(muestras.shape[1])]
+        inicios = range(0, len(muestras), FRAMES_POR_BLOQUE_SIN_PERDIDA)
+        if len(senales) != 2:
+            return [ESTEREO_INDEPENDIENTE] * len(inicios), senales
+        
+        elegidas = [self._decorrelacionar(*(senal[inicio:inicio + FRAMES_POR_BLOQUE_SIN_PERDIDA]
+                                            for senal in senales))
+                    for inicio in inicios]
+        codigos = [decorrelacion for decorrelacion, _ in elegidas]
+        return codigos, [np.concatenate([par[canal] for _, par in elegidas]) for canal in range(2)]
+    
+    def _codificar_canal(self, senal):
+        """Codifica la señal de un canal en subtramas de FRAMES_POR_BLOQUE_SIN_PERDIDA"""
+        return [self._codificar_subtrama(senal[inicio:inicio + FRAMES_POR_BLOQUE_SIN_PERDIDA])
+                for inicio in range(0, len(senal), FRAMES_POR_BLOQUE_SIN_PERDIDA)]
+    
+    def _intercalar_subtramas(self, decorrelaciones, subtramas):
+        """Arma los bloques del .lac con la decorrelación y la subtrama de cada canal"""
+        partes = []
+        for posicion, decorrelacion in enumerate(decorrelaciones):
+            partes.append(struct.pack(FORMATO_BLOQUE_LAC, decorrelacion))
+            partes.extend(canal[posicion] for canal in subtramas)
+        return b"".join(partes)
+    
+    def _decorrelacionar(self, izquierdo, derecho):
+        """
+        Elige el par de señales estéreo más barato de codificar, estimando el
+        costo de cada señal por la suma del valor absoluto de su segunda diferencia
+        """
+        lateral = izquierdo - derecho
+        medio = (izquierdo + derecho) >> 1
+        costo = {nombre: int(np.abs(np.diff(senal, n=2)).sum())
+                 for nombre, senal in (("izquierdo", izquierdo), ("derecho", derecho),
+                                       ("lateral", lateral), ("medio", medio))}
+        opciones = {
+            ESTEREO_INDEPENDIENTE: (costo["izquierdo"] + costo["derecho"], [izquierdo, derecho]),
+            ESTEREO_IZQUIERDO_LATERAL: (costo["izquierdo"] + costo["lateral"], [izquierdo, lateral]),
+            ESTEREO_LATERAL_DERECHO: (costo["lateral"] + costo["derecho"], [lateral, derecho]),
+            ESTEREO_MEDIO_LATERAL: (costo["medio"] + costo["lateral"], [medio, lateral]),
+        }
+        decorrelacion = min(opciones, key=lambda opcion: opciones[opcion][0])
+        return decorrelacion, opciones[decorrelacion][1]
+    
+    def _codificar_subtrama(self, senal):
+        """
+        Codifica una señal con el predictor fijo de menor residuo y el
+        parámetro de Rice de menor costo
+        """
+        ordenes = range(min(ORDEN_MAXIMO, len(senal)) + 1)
+        orden = min(ordenes, key=lambda orden: int(np.abs(np.diff(senal, n=orden)).sum()))
+        residuo = np.diff(senal, n=orden)
+        
+        # Zigzag: 0, -1, 1, -2, 2... pasan a 0, 1, 2, 3, 4...
+        valores = ((residuo << 1) ^ (residuo >> 63)).astype(np.uint64)
+        k = self._parametro_rice(valores)
+        unario, bajos = self._codificar_rice(valores, k)
+        
+        return (struct.pack(FORMATO_SUBTRAMA, orden, k, len(unario), len(bajos))
+                + senal[:orden].astype('<i8').tobytes() + unario + bajos)
+    
+    def _parametro_rice(self, valores):
+        """Elige el parámetro k que minimiza los bits de los códigos de Rice"""
+        if len(valores) == 0:
+            return 0
+        media = int(valores.mean())
+        candidatos = {max(0, media.bit_length() - 2 + delta) for delta in range(3)}
+        # Cada valor ocupa (valor >> k) + 1 bits de unario y k bits bajos
+        return min(candidatos, key=lambda k: int((valores >> np.uint64(k)).sum()) + len(valores) * (k + 1))
+    
+    def _codificar_rice(self, valores, k):
+        """
+        Codifica los valores con códigos de Rice separados en dos flujos: la
+        parte unaria (cociente en ceros terminados por un uno) y los k bits bajos
+        """
+        cocientes = (valores >> np.uint64(k)).astype(np.int64)
+        # Cada cociente q ocupa q ceros seguidos de un uno
+        fin_codigos = np.cumsum(cocientes + 1)
+        bits_unarios = np.zeros(int(fin_codigos[-1]) if len(fin_codigos) else 0, dtype=np.uint8)
+        bits_unarios[fin_codigos - 1] = 1
+        # De cada valor se guardan solo sus k bits bajos
+        return np.packbits(bits_unarios).tobytes(), empaquetar_codigos(valores, k)
+    
+    def _comprimir_profundidad(self, archivo_audio, archivo_salida, bits, factor_muestreo, notificador):
+        """
+        Comprime un WAV escribiendo menos bytes por muestra: cada muestra se
+        redondea a `bits` bits y la salida es un WAV reproducible más pequeño
+        """
+        try:
+            with wave.open(archivo_audio, 'rb') as audio:
+                params = audio.getparams()
+                notificador.fase(FASE_CODIFICANDO, params.nframes * params.nchannels * params.sampwidth)
+                if bits not in (8, 16, 24) or bits > 8 * params.sampwidth:
+                    raise ValueError(f"Profundidad de {bits} bits no válida para un WAV de "
+                                     f"{8 * params.sampwidth} bits")
+                ancho_destino = bits // 8
+                with self._abrir_wav_salida(archivo_salida, params.nchannels, ancho_destino,
+                                            params.framerate // factor_muestreo,
+                                            -(-params.nframes // factor_muestreo)) as salida:
+                    for muestras in self._bloques_muestras(audio, notificador, factor_muestreo):
+                        reducidas = self._reducir_profundidad(muestras.reshape(-1), params.sampwidth,
+                                                              ancho_destino)
+                        salida.writeframes(self._muestras_a_frames(reducidas, ancho_destino))
+            notificador.terminar()
             
-            # Guardar como WAV reproducible
-            self._guardar_wav_comprimido(archivo_salida, muestras_comprimidas, params)
+            return archivo_salida
+            
+        except OperacionCancelada:
+            raise
+        except Exception as e:
+            raise Exception(f"Error reduciendo la profundidad del WAV: {e}")
+    
+    def _reducir_profundidad(self, muestras, ancho_original, ancho_destino):
+        """Redondea muestras de ancho_original bytes a ancho_destino bytes"""
+        desplazamiento = 8 * (ancho_original - ancho_destino)
+        if desplazamiento <= 0:
+            return muestras << -desplazamiento
+        redondeadas = (muestras.astype(np.int64) + (1 << (desplazamiento - 1))) >> desplazamiento
+        # El redondeo hacia arriba de la muestra máxima se sale del rango
+        return np.minimum(redondeadas, (1 << (8 * ancho_destino - 1)) - 1)
+    
+    def _comprimir_adpcm(self, archivo_audio, archivo_salida, bits, factor_muestreo, procesos, notificador):
+        """
+        Comprime un WAV con IMA-ADPCM: cada muestra se codifica con `bits` bits
+        como la diferencia cuantizada respecto de la muestra anterior, con un
+        paso de cuantización que se adapta a la señal
+        """
+        try:
+            if bits not in TABLAS_INDICE_ADPCM:
+                raise ValueError(f"ADPCM admite de 2 a 5 bits por muestra, no {bits}")
+            procesos = procesos or os.cpu_count() or 1
+            
+            with wave.open(archivo_audio, 'rb') as audio, open(archivo_salida, 'wb') as salida, \
+                    self._grupo_procesos(procesos) as ejecutor:
+                params = audio.getparams()
+                notificador.fase(FASE_CODIFICANDO, params.nframes * params.nchannels * params.sampwidth)
+                salida.write(struct.pack(FORMATO_ENCABEZADO_ADPCM, MAGIA_ADPCM, VERSION_ADPCM,
+                                         params.nchannels, bits, params.framerate // factor_muestreo,
+                                         -(-params.nframes // factor_muestreo)))
+                
+                def tareas():
+                    for muestras in self._bloques_muestras(audio, notificador, factor_muestreo):
+                        # ADPCM trabaja sobre muestras de 16 bits
+                        muestras = self._reducir_profundidad(muestras, params.sampwidth, 2)
+                        for canal in range(params.nchannels):
+                            yield np.ascontiguousarray(muestras[:, canal]), bits
+                
+                resultados = self._mapear(ejecutor, _codificar_canal_adpcm, tareas(), 2 * procesos)
+                for canales in self._agrupar(resultados, params.nchannels):
+                    salida.write(self._intercalar_bloques_adpcm(canales))
+            notificador.terminar()
             
             return archivo_salida
             
+        except OperacionCancelada:
+            raise
         except Exception as e:
-            raise Exception(f"Error comprimiendo WAV: {e}")
+            raise Exception(f"Error comprimiendo WAV con ADPCM: {e}")
+    
+    def _codificar_canal_adpcm(self, senal, bits):
+        """
+        Codifica la señal de 16 bits de un canal en bloques de
+        FRAMES_POR_BLOQUE_ADPCM; devuelve (frames, predictor, índice, códigos
+        empaquetados) por bloque
+        """
+        bloques = []
+        for inicio in range(0, len(senal), FRAMES_POR_BLOQUE_ADPCM):
+            bloque = senal[inicio:inicio + FRAMES_POR_BLOQUE_ADPCM]
+            predictor, indice, codigos = self._codificar_adpcm(bloque, bits)
+            empaquetados = empaquetar_codigos(np.frombuffer(codigos, dtype=np.uint8), bits)
+            bloques.append((len(bloque), predictor, indice, empaquetados))
+        return bloques
+    
+    def _intercalar_bloques_adpcm(self, canales):
+        """Arma los bloques del .adp con el estado y los códigos de cada canal"""
+        partes = []
+        for bloques in zip(*canales):
+            partes.append(struct.pack(FORMATO_BLOQUE_ADPCM, bloques[0][0]))
+            partes.extend(struct.pack(FORMATO_CANAL_ADPCM, predictor, indice)
+                          for _, predictor, indice, _ in bloques)
+            partes.extend(datos for _, _, _, datos in bloques)
+        return b"".join(partes)
+    
+    def _codificar_adpcm(self, senal, bits):
+        """
+        Codifica una señal de 16 bits; devuelve la muestra inicial, el índice
+        de paso inicial y un código por cada muestra siguiente
+        """
+        predictor = int(senal[0])
+        # Empezar con el paso más cercano a la variación típica del bloque
+        variacion = int(np.abs(np.diff(senal[:64])).mean()) if len(senal) > 1 else 0
+        indice = min(int(np.searchsorted(PASOS_IMA, variacion)), len(PASOS_IMA) - 1)
+        indice_inicial = indice
+        
+        # Todo lo que el bucle consulta queda en variables locales y las
+        # transiciones vienen precalculadas: es el costo por muestra del modo
+        diferencias, siguientes = self._transiciones_adpcm(bits)
+        divisores = [paso << 1 for paso in PASOS_IMA]
+        desplazamiento = bits - 1
+        signo = 1 << desplazamiento
+        magnitud_maxima = signo - 1
+        codigos = bytearray(len(senal) - 1)
+        for posicion, muestra in enumerate(senal[1:].tolist()):
+            # La magnitud m reconstruye ((2m + 1) * paso) >> desplazamiento
+            diferencia = muestra - predictor
+            if diferencia < 0:
+                magnitud = (-diferencia << desplazamiento) // divisores[indice]
+                codigo = signo | (magnitud if magnitud < magnitud_maxima else magnitud_maxima)
+            else:
+                magnitud = (diferencia << desplazamiento) // divisores[indice]
+                codigo = magnitud if magnitud < magnitud_maxima else magnitud_maxima
+            codigos[posicion] = codigo
+            
+            # Seguir exactamente al decodificador para no acumular error
+            clave = (indice << bits) | codigo
+            predictor += diferencias[clave]
+            if predictor > 32767:
+                predictor = 32767
+            elif predictor < -32768:
+                predictor = -32768
+            indice = siguientes[clave]
+        
+        return int(senal[0]), indice_inicial, codigos
+    
+    def _transiciones_adpcm(self, bits):
+        """
+        Precalcula el cuantizador IMA para `bits` bits por código. Devuelve
+        dos listas indexadas por (índice de paso << bits) | código: lo que el
+        código suma al predictor y el índice de paso siguiente, ya acotado.
+        """
+        if bits not in _transiciones_adpcm:
+            tabla_indices = TABLAS_INDICE_ADPCM[bits]
+            desplazamiento = bits - 1
+            signo = 1 << desplazamiento
+            diferencias = []
+            siguientes = []
+            for indice, paso in enumerate(PASOS_IMA):
+                for codigo in range(1 << bits):
+                    magnitud = codigo & (signo - 1)
+                    cuantizada = ((2 * magnitud + 1) * paso) >> desplazamiento
+                    diferencias.append(-cuantizada if codigo & signo else cuantizada)
+                    siguientes.append(max(0, min(len(PASOS_IMA) - 1, indice + tabla_indices[magnitud])))
+            _transiciones_adpcm[bits] = diferencias, siguientes
+        return _transiciones_adpcm[bits]
+    
+    def _bloques_muestras(self, audio, notificador, factor_muestreo=1, frames_por_bloque=FRAMES_POR_BLOQUE):
+        """
+        Genera las muestras de un WAV abierto en bloques (frames, canales),
+        diezmadas por factor_muestreo si es mayor que 1
+        """
+        params = audio.getparams()
+        bloques = (self._frames_a_muestras(frames, params.sampwidth).reshape(-1, params.nchannels)
+                   for frames in self._leer_bloques(audio, notificador, frames_por_bloque))
+        if factor_muestreo == 1:
+            return bloques
+        return self._diezmar(bloques, factor_muestreo, params.nchannels, params.sampwidth)
+    
+    def _diezmar(self, bloques, factor, canales, ancho_muestra):
+        """
+        Filtra con un pasabajos antialias y conserva una de cada `factor`
+        muestras. El filtro continúa entre bloques, así que la salida es la
+        misma que si se procesara todo el audio de una vez.
+        """
+        filtro = self._filtro_antialias(factor)
+        retardo = (len(filtro) - 1) // 2
+        minimo = -(1 << (8 * ancho_muestra - 1))
+        maximo = -minimo - 1
+        
+        # El filtro está centrado: se rellena con ceros al principio y al final
+        # para que la salida i corresponda a la muestra i * factor
+        bufer = np.zeros((retardo, canales))
+        for bloque in itertools.chain(bloques, [np.zeros((retardo, canales))]):
+            bufer = np.concatenate((bufer, bloque))
+            if len(bufer) < len(filtro):
+                continue
+            filtradas = np.stack([np.convolve(bufer[:, canal], filtro, 'valid')[::factor]
+                                  for canal in range(canales)], axis=1)
+            # Conservar desde la posición de la próxima salida
+            bufer = bufer[len(filtradas) * factor:]
+            yield np.clip(np.rint(filtradas), minimo, maximo).astype(np.int64)
+    
+    def _filtro_antialias(self, factor):
+        """Pasabajos FIR de fase lineal (sinc con ventana de Blackman)"""
+        coeficientes = COEFICIENTES_POR_FACTOR * factor + 1
+        corte = BANDA_PASANTE / factor
+        posiciones = np.arange(coeficientes) - (coeficientes - 1) / 2
+        filtro = corte * np.sinc(corte * posiciones) * np.blackman(coeficientes)
+        return filtro / filtro.sum()
+    
+    def _grupo_procesos(self, procesos):
+        """Grupo de procesos para las tareas por canal; con un solo proceso no se crea"""
+        if procesos > 1:
+            return ProcessPoolExecutor(max_workers=procesos)
+        return contextlib.nullcontext()
     
-    def _simular_compresion_mp3(self, archivo_audio):
+    def _mapear(self, ejecutor, funcion, tareas, ventana):
+        """Aplica la función a las tareas en orden, en el grupo de procesos si lo hay"""
+        if ejecutor is None:
+            return map(funcion, tareas)
+        return mapear_en_orden(ejecutor, funcion, tareas, ventana)
+    
+    def _agrupar(self, resultados, canales):
+        """Agrupa los resultados por canal en listas con los canales de cada bloque"""
+        resultados = iter(resultados)
+        while True:
+            grupo = list(itertools.islice(resultados, canales))
+            if not grupo:
+                return
+            yield grupo
+    
+    def _simular_compresion_mp3(self, archivo_audio, directorio_salida=None):
         """Simula compresión MP3 (no podemos comprimir MP3 realmente)"""
         try:
-            nombre_base = os.path.splitext(archivo_audio)[0]
+            nombre_base = ruta_base_salida(archivo_audio, directorio_salida)
             archivo_salida = nombre_base + "_info_compresion.txt"
             
             # Crear archivo de información sobre la compresión
@@ -75,86 +570,290 @@ class CompresorAudio:
         except Exception as e:
             raise Exception(f"Error en simulación MP3: {e}")
     
-    def _frames_a_muestras(self, frames, sampwidth):
-        """Convierte frames de audio a lista de muestras"""
-        if sampwidth == 1:
-            formato = 'B'
-            offset = 128
-        elif sampwidth == 2:
-            formato = 'h'
-            offset = 0
-        else:
-            formato = 'i'
-            offset = 0
+    # ======================================================
+    # DESCOMPRESIÓN
+    # ======================================================
+    def descomprimir(self, archivo_comprimido, procesos=None, progreso=None, directorio_salida=None):
+        """
+        Reconstruye un WAV a partir de un archivo .lac (sin pérdida) o .adp
+        (ADPCM), decodificando cada canal de cada bloque en un grupo de procesos.
+        La función `progreso` recibe EventoProgreso con los bytes comprimidos leídos.
+        """
+        try:
+            nombre_base = ruta_base_salida(archivo_comprimido, directorio_salida)
+            archivo_salida = nombre_base + "_descomprimido.wav"
+            procesos = procesos or os.cpu_count() or 1
+            notificador = NotificadorProgreso(progreso, os.path.getsize(archivo_comprimido))
+            notificador.fase(FASE_DECODIFICANDO)
+            
+            with open(archivo_comprimido, 'rb') as entrada, salida_atomica(archivo_salida) as temporal:
+                magia = entrada.read(len(MAGIA_SIN_PERDIDA))
+                entrada.seek(0)
+                if magia == MAGIA_SIN_PERDIDA:
+                    self._descomprimir_sin_perdida(entrada, temporal, procesos, notificador)
+                elif magia == MAGIA_ADPCM:
+                    self._descomprimir_adpcm(entrada, temporal, procesos, notificador)
+                else:
+                    raise ValueError("El archivo no es un audio comprimido compatible")
+            notificador.terminar()
+            
+            return archivo_salida
+            
+        except OperacionCancelada:
+            raise
+        except Exception as e:
+            raise Exception(f"Error en descompresión de audio: {e}")
+    
+    def _leer_encabezado(self, entrada, formato, magia_esperada, version_esperada):
+        """Lee y valida el encabezado de un archivo comprimido"""
+        encabezado = entrada.read(struct.calcsize(formato))
+        if len(encabezado) < struct.calcsize(formato):
+            raise ValueError("El archivo no tiene un encabezado válido")
+        campos = struct.unpack(formato, encabezado)
+        if campos[0] != magia_esperada or campos[1] != version_esperada:
+            raise ValueError("Versión de archivo no compatible")
+        return campos[2:]
+    
+    def _descomprimir_sin_perdida(self, entrada, archivo_salida, procesos, notificador):
+        """Decodifica un .lac ya abierto y escribe el WAV original"""
+        canales, ancho_muestra, frecuencia, total_frames, frames_por_bloque = self._leer_encabezado(
+            entrada, FORMATO_ENCABEZADO_LAC, MAGIA_SIN_PERDIDA, VERSION_SIN_PERDIDA)
+        inicios = range(0, total_frames, frames_por_bloque)
+        bloques_por_tarea = max(1, FRAMES_POR_BLOQUE // frames_por_bloque)
+        decorrelaciones = deque()
+        
+        def tareas():
+            # Cada tarea es un canal de varios bloques consecutivos
+            for grupo in range(0, len(inicios), bloques_por_tarea):
+                codigos, cantidades = [], []
+                subtramas = [[] for _ in range(canales)]
+                for inicio in inicios[grupo:grupo + bloques_por_tarea]:
+                    cantidades.append(min(frames_por_bloque, total_frames - inicio))
+                    codigos.append(struct.unpack(FORMATO_BLOQUE_LAC,
+                                                 self._leer_exacto(entrada, struct.calcsize(FORMATO_BLOQUE_LAC)))[0])
+                    for canal in subtramas:
+                        canal.append(self._leer_subtrama(entrada))
+                decorrelaciones.append((codigos, cantidades))
+                for canal in subtramas:
+                    yield canal, cantidades
+                notificador.actualizar(entrada.tell())
+        
+        with self._abrir_wav_salida(archivo_salida, canales, ancho_muestra,
+                                    frecuencia, total_frames) as salida, \
+                self._grupo_procesos(procesos) as ejecutor:
+            resultados = self._mapear(ejecutor, _decodificar_canal_sin_perdida, tareas(), 2 * procesos)
+            for senales in self._agrupar(resultados, canales):
+                codigos, cantidades = decorrelaciones.popleft()
+                muestras = self._recorrelacionar(codigos, cantidades, senales)
+                salida.writeframes(self._muestras_a_frames(muestras.reshape(-1), ancho_muestra))
+    
+    def _descomprimir_adpcm(self, entrada, archivo_salida, procesos, notificador):
+        """Decodifica un .adp ya abierto y escribe un WAV de 16 bits"""
+        canales, bits, frecuencia, total_frames = self._leer_encabezado(
+            entrada, FORMATO_ENCABEZADO_ADPCM, MAGIA_ADPCM, VERSION_ADPCM)
+        tamano_canal = struct.calcsize(FORMATO_CANAL_ADPCM)
+        bloques_por_tarea = max(1, FRAMES_POR_BLOQUE // FRAMES_POR_BLOQUE_ADPCM)
+        
+        def tareas():
+            # Cada tarea es un canal de varios bloques consecutivos
+            leidos = 0
+            while leidos < total_frames:
+                bloques = [[] for _ in range(canales)]
+                for _ in range(bloques_por_tarea):
+                    if leidos >= total_frames:
+                        break
+                    cantidad, = struct.unpack(FORMATO_BLOQUE_ADPCM, self._leer_exacto(
+                        entrada, struct.calcsize(FORMATO_BLOQUE_ADPCM)))
+                    estados = [struct.unpack(FORMATO_CANAL_ADPCM, self._leer_exacto(entrada, tamano_canal))
+                               for _ in range(canales)]
+                    bytes_canal = -(-(cantidad - 1) * bits // 8)
+                    for canal, (predictor, indice) in zip(bloques, estados):
+                        canal.append((predictor, indice, self._leer_exacto(entrada, bytes_canal), cantidad))
+                    leidos += cantidad
+                for canal in bloques:
+                    yield canal, bits
+                notificador.actualizar(entrada.tell())
         
-        muestras = []
-        for i in range(0, len(frames), sampwidth):
-            muestra = struct.unpack(formato, frames[i:i+sampwidth])[0]
-            if sampwidth == 1:
-                muestra -= offset
-            muestras.append(muestra)
+        with self._abrir_wav_salida(archivo_salida, canales, 2, frecuencia, total_frames) as salida, \
+                self._grupo_procesos(procesos) as ejecutor:
+            resultados = self._mapear(ejecutor, _decodificar_canal_adpcm, tareas(), 2 * procesos)
+            for senales in self._agrupar(resultados, canales):
+                salida.writeframes(self._muestras_a_frames(np.stack(senales, axis=1).reshape(-1), 2))
+    
+    def _leer_exacto(self, entrada, cantidad):
+        """Lee exactamente `cantidad` bytes o falla si el archivo termina antes"""
+        datos = entrada.read(cantidad)
+        if len(datos) < cantidad:
+            raise ValueError("Los datos comprimidos están incompletos")
+        return datos
+    
+    def _decodificar_canal_adpcm(self, bloques, bits):
+        """Reconstruye la señal de un canal a partir de sus bloques ADPCM"""
+        return np.concatenate([self._decodificar_adpcm(predictor, indice, datos, bits, cantidad)
+                               for predictor, indice, datos, cantidad in bloques])
+    
+    def _decodificar_adpcm(self, predictor, indice, datos, bits, cantidad):
+        """Reconstruye `cantidad` muestras de 16 bits de un canal ADPCM"""
+        codigos = desempaquetar_codigos(datos, cantidad - 1, bits).tolist()
         
+        diferencias, siguientes = self._transiciones_adpcm(bits)
+        senal = [predictor]
+        agregar = senal.append
+        for codigo in codigos:
+            clave = (indice << bits) | codigo
+            predictor += diferencias[clave]
+            if predictor > 32767:
+                predictor = 32767
+            elif predictor < -32768:
+                predictor = -32768
+            indice = siguientes[clave]
+            agregar(predictor)
+        return np.array(senal, dtype=np.int64)
+    
+    def _leer_subtrama(self, entrada):
+        """Lee los bytes de una subtrama sin decodificarla"""
+        encabezado = self._leer_exacto(entrada, struct.calcsize(FORMATO_SUBTRAMA))
+        orden, _, bytes_unario, bytes_bajos = struct.unpack(FORMATO_SUBTRAMA, encabezado)
+        return encabezado + self._leer_exacto(entrada, 8 * orden + bytes_unario + bytes_bajos)
+    
+    def _decodificar_canal(self, subtramas, cantidades):
+        """Reconstruye la señal de un canal a partir de sus subtramas"""
+        return np.concatenate([self._decodificar_subtrama(subtrama, cantidad)
+                               for subtrama, cantidad in zip(subtramas, cantidades)])
+    
+    def _recorrelacionar(self, codigos, cantidades, senales):
+        """
+        Deshace la decorrelación estéreo de cada bloque y vuelve a juntar los
+        canales; devuelve las muestras (frames, canales)
+        """
+        muestras = np.stack(senales, axis=1)
+        inicio = 0
+        for decorrelacion, cantidad in zip(codigos, cantidades):
+            bloque = muestras[inicio:inicio + cantidad]
+            if decorrelacion == ESTEREO_IZQUIERDO_LATERAL:
+                bloque[:, 1] = bloque[:, 0] - bloque[:, 1]
+            elif decorrelacion == ESTEREO_LATERAL_DERECHO:
+                bloque[:, 0] = bloque[:, 0] + bloque[:, 1]
+            elif decorrelacion == ESTEREO_MEDIO_LATERAL:
+                medio, lateral = bloque[:, 0], bloque[:, 1]
+                # El bit perdido al dividir el medio es el mismo que el bit bajo del lateral
+                doble_medio = (medio << 1) | (lateral & 1)
+                bloque[:, 0], bloque[:, 1] = (doble_medio + lateral) >> 1, (doble_medio - lateral) >> 1
+            elif decorrelacion != ESTEREO_INDEPENDIENTE:
+                raise ValueError(f"Decorrelación estéreo desconocida: {decorrelacion}")
+            inicio += cantidad
         return muestras
     
+    def _decodificar_subtrama(self, datos, cantidad):
+        """Decodifica los bytes de una subtrama y reconstruye sus `cantidad` muestras"""
+        orden, k, bytes_unario, bytes_bajos = struct.unpack_from(FORMATO_SUBTRAMA, datos)
+        posicion = struct.calcsize(FORMATO_SUBTRAMA)
+        iniciales = np.frombuffer(datos, dtype='<i8', count=orden, offset=posicion).astype(np.int64)
+        posicion += 8 * orden
+        unario = datos[posicion:posicion + bytes_unario]
+        bajos = datos[posicion + bytes_unario:posicion + bytes_unario + bytes_bajos]
+        valores = self._decodificar_rice(unario, bajos, k, cantidad - orden)
+        residuo = (valores >> np.uint64(1)).astype(np.int64) ^ -(valores & np.uint64(1)).astype(np.int64)
+        
+        # Deshacer las diferencias: cada orden es la suma acumulada del siguiente
+        senal = residuo
+        for nivel in range(orden - 1, -1, -1):
+            primero = np.diff(iniciales, n=nivel)[0]
+            senal = np.concatenate(([primero], primero + np.cumsum(senal)))
+        return senal
+    
+    def _decodificar_rice(self, unario, bajos, k, cantidad):
+        """Decodifica `cantidad` códigos de Rice de sus flujos unario y de bits bajos"""
+        if cantidad <= 0:
+            return np.zeros(0, dtype=np.uint64)
+        fin_codigos = np.flatnonzero(np.unpackbits(np.frombuffer(unario, dtype=np.uint8)))[:cantidad]
+        if len(fin_codigos) < cantidad:
+            raise ValueError("Los datos comprimidos están incompletos")
+        cocientes = np.diff(fin_codigos, prepend=-1) - 1
+        
+        valores = cocientes.astype(np.uint64) << np.uint64(k)
+        return valores | desempaquetar_codigos(bajos, cantidad, k)
+    
+    def _frames_a_muestras(self, frames, sampwidth):
+        """
+        Convierte frames de audio a un arreglo de muestras con signo.
+        Hasta 24 bits se usa int32; las muestras de 32 bits usan int64 para
+        que las operaciones sobre ellas no desborden.
+        """
+        if sampwidth == 1:
+            # Las muestras de 8 bits son sin signo con el cero en 128
+            return np.frombuffer(frames, dtype=np.uint8).astype(np.int32) - 128
+        elif sampwidth == 2:
+            return np.frombuffer(frames, dtype='<i2').astype(np.int32)
+        elif sampwidth == 3:
+            octetos = np.frombuffer(frames, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+            muestras = octetos[:, 0] | (octetos[:, 1] << 8) | (octetos[:, 2] << 16)
+            # Extender el signo del bit 23
+            return (muestras ^ 0x800000) - 0x800000
+        elif sampwidth == 4:
+            return np.frombuffer(frames, dtype='<i4').astype(np.int64)
+        raise ValueError(f"Ancho de muestra no soportado: {sampwidth} bytes")
+    
     def _muestras_a_frames(self, muestras, sampwidth):
-        """Convierte lista de muestras a frames de audio"""
-        frames = b''
+        """Convierte un arreglo de muestras a frames de audio"""
         if sampwidth == 1:
-            formato = 'B'
-            offset = 128
+            return (muestras + 128).astype(np.uint8).tobytes()
         elif sampwidth == 2:
-            formato = 'h'
-            offset = 0
-        else:
-            formato = 'i'
-            offset = 0
-        
-        for muestra in muestras:
-            if sampwidth == 1:
-                muestra += offset
-            frames += struct.pack(formato, muestra)
-        
-        return frames
+            return muestras.astype('<i2').tobytes()
+        elif sampwidth == 3:
+            # Tomar los tres bytes bajos de cada muestra en little-endian
+            return muestras.astype('<i4').view(np.uint8).reshape(-1, 4)[:, :3].tobytes()
+        elif sampwidth == 4:
+            return muestras.astype('<i4').tobytes()
+        raise ValueError(f"Ancho de muestra no soportado: {sampwidth} bytes")
     
     def _comprimir_muestras(self, muestras, factor=2):
         """Comprime muestras reduciendo la resolución (pérdida de calidad)"""
-        return [muestra // factor * factor for muestra in muestras]
+        return muestras // factor * factor
     
-    def _guardar_wav_comprimido(self, archivo_salida, muestras_comprimidas, params_original):
+    def _leer_bloques(self, audio, notificador, frames_por_bloque=FRAMES_POR_BLOQUE):
         """
-        Guarda las muestras comprimidas como un archivo WAV reproducible
+        Genera los frames de un WAV abierto en bloques de frames_por_bloque e
+        informa los bytes leídos después de procesar cada bloque
         """
-        # Convertir muestras a frames
-        frames_comprimidos = self._muestras_a_frames(muestras_comprimidas, params_original.sampwidth)
-        
-        # Crear nuevo archivo WAV
-        with wave.open(archivo_salida, 'wb') as audio:
-            # Usar los mismos parámetros pero ajustar nframes
-            audio.setnchannels(params_original.nchannels)
-            audio.setsampwidth(params_original.sampwidth)
-            audio.setframerate(params_original.framerate)
-            audio.setnframes(len(muestras_comprimidas) // params_original.nchannels)
-            audio.writeframes(frames_comprimidos)
-
-# Necesitamos importar estas funciones desde utilidades
-def obtener_tamano_archivo(ruta_archivo):
-    """Obtiene el tamaño de un archivo en bytes"""
-    try:
-        return os.path.getsize(ruta_archivo)
-    except OSError:
-        return 0
-
-def formatear_tamano(tamano_bytes):
-    """Formatea el tamaño en bytes a una representación legible"""
-    if tamano_bytes == 0:
-        return "0 B"
-    
-    unidades = ['B', 'KB', 'MB', 'GB']
-    tamano = float(tamano_bytes)
-    
-    for unidad in unidades:
-        if tamano < 1024.0 or unidad == unidades[-1]:
-            return f"{tamano:.2f} {unidad}"
-        tamano /= 1024.0
-    
-    return f"{tamano_bytes} B"
\ No newline at end of file
+        while True:
+            frames = audio.readframes(frames_por_bloque)
+            if not frames:
+                return
+            yield frames
+            notificador.avanzar(len(frames))
+    
+    def _abrir_wav_salida(self, archivo_salida, canales, ancho_muestra, frecuencia, total_frames):
+        """
+        Abre un WAV reproducible con los parámetros indicados. Los bloques
+        se escriben con writeframes a medida que se procesan.
+        """
+        audio = wave.open(archivo_salida, 'wb')
+        audio.setnchannels(canales)
+        audio.setsampwidth(ancho_muestra)
+        audio.setframerate(frecuencia)
+        audio.setnframes(total_frames)
+        return audio
+
+
+def _codificar_canal_sin_perdida(senal):
+    """Codifica en subtramas .lac la señal de un canal de un bloque"""
+    return CompresorAudio()._codificar_canal(senal)
+
+
+def _decodificar_canal_sin_perdida(tarea):
+    """Reconstruye la señal de un canal a partir de sus subtramas .lac"""
+    subtramas, cantidades = tarea
+    return CompresorAudio()._decodificar_canal(subtramas, cantidades)
+
+
+def _codificar_canal_adpcm(tarea):
+    """Codifica en bloques ADPCM la señal de 16 bits de un canal de un bloque"""
+    senal, bits = tarea
+    return CompresorAudio()._codificar_canal_adpcm(senal, bits)
+
+
+def _decodificar_canal_adpcm(tarea):
+    """Reconstruye la señal de un canal a partir de sus bloques ADPCM"""
+    bloques, bits = tarea
+    return CompresorAudio()._decodificar_canal_adpcm(bloques, bits)
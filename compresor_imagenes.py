@@ -1,126 +1,590 @@
 # compresor_imagenes.py
 from PIL import Image
-import os
+from concurrent.futures import ThreadPoolExecutor
+import mmap
+import numpy as np
+import struct
+
+from cache_compresion import compresion_con_cache
+from flujo_bits import codificar_varints, leer_varints
+from progreso import (FASE_CODIFICANDO, FASE_DECODIFICANDO, FASE_ESCRIBIENDO,
+                      NotificadorProgreso, OperacionCancelada)
+from utilidades import ruta_base_salida, salida_atomica
+
+# Formato binario .rle v2:
+#   encabezado | paleta de la imagen (solo modo P) | datos del esquema |
+#   secciones (valores de las corridas + longitudes en varint)
+MAGIA_RLE = b"RLE"
+VERSION_RLE = 2
+# magia, versión, esquema, modo de la imagen (ASCII), ancho, alto, total de corridas
+FORMATO_ENCABEZADO = "<3sBB4sIIQ"
+# bytes por valor, cantidad de corridas, bytes ocupados por las longitudes
+FORMATO_SECCION = "<BQQ"
+# Esquemas de RLE
+ESQUEMA_PIXEL = 0        # corridas de píxeles completos
+ESQUEMA_PLANAR = 1       # corridas de cada canal por separado, una sección por canal
+ESQUEMA_DELTA_FILAS = 2  # corridas del XOR de cada fila con la anterior
+ESQUEMA_PALETA = 3       # corridas de índices a una paleta de hasta 256 colores
+ESQUEMAS = (ESQUEMA_PIXEL, ESQUEMA_PLANAR, ESQUEMA_DELTA_FILAS, ESQUEMA_PALETA)
+# cantidad de colores de la paleta (seguida de los colores empaquetados)
+FORMATO_PALETA = "<H"
+# Modos que se comprimen tal cual; el resto se convierte a RGB o RGBA
+MODOS_NATIVOS = ("1", "L", "LA", "P", "RGB", "RGBA")
+# Las imágenes en modo P guardan su paleta como colores RGBA
+MODO_PALETA_IMAGEN = "RGBA"
+# Filas que se usan para estimar el esquema más pequeño, en franjas consecutivas
+FILAS_MUESTRA = 64
+FILAS_FRANJA_MUESTRA = 8
+# Corridas que se expanden por tanda al descomprimir (acota la memoria temporal)
+CORRIDAS_POR_TANDA = 1 << 16
+
+# Contenedor por franjas horizontales:
+#   encabezado | índice de franjas | franjas
+# Cada franja es un flujo .rle v2 completo con su propio esquema.
+MAGIA_FRANJAS = b"RLF"
+# magia, versión, modo de la imagen (ASCII), ancho, alto, filas por franja, cantidad de franjas
+FORMATO_ENCABEZADO_FRANJAS = "<3sB4sIIII"
+# posición de la franja en el archivo, tamaño en bytes
+FORMATO_INDICE_FRANJA = "<QQ"
+ALTO_FRANJA = 256
 
 class CompresorImagenes:
-    def __init__(self):
+    def __init__(self, cache=None):
         self.ultima_salida = None  # Guarda el último archivo generado (comprimido o reconstruido)
+        # CacheCompresion opcional: si la imagen ya se comprimió igual se reutiliza
+        self.cache = cache
 
     # ======================================================
     # COMPRESIÓN
     # ======================================================
-    def comprimir(self, archivo_imagen):
+    def comprimir(self, archivo_imagen, esquema=None, progreso=None, directorio_salida=None):
         """
-        Comprime una imagen usando Run-Length Encoding (RLE)
+        Comprime una imagen usando Run-Length Encoding (RLE). Si no se indica
+        el esquema se elige el que resulta más pequeño sobre una muestra.
+        La función `progreso` recibe EventoProgreso con los bytes de píxeles.
         """
         try:
-            imagen = Image.open(archivo_imagen)
-            imagen = imagen.convert("RGB")  # Asegura modo RGB
-            ancho, alto = imagen.size
-            modo = imagen.mode
-            pixeles = list(imagen.getdata())
+            nombre_base = ruta_base_salida(archivo_imagen, directorio_salida)
+            archivo_salida = nombre_base + "_comprimido.rle"
+
+            with compresion_con_cache(self.cache, archivo_imagen, archivo_salida, "rle", esquema=esquema,
+                                      version=VERSION_RLE) as en_cache:
+                if en_cache:
+                    self.ultima_salida = archivo_salida
+                    return archivo_salida
+
+                imagen = self._preparar_imagen(Image.open(archivo_imagen))
+                ancho, alto = imagen.size
+                # Un arreglo (ancho*alto, canales) sin objetos Python por píxel
+                pixeles = self._pixeles(imagen)
+                notificador = NotificadorProgreso(progreso, pixeles.nbytes)
+
+                # Aplicar RLE con el esquema indicado o con el mejor según la muestra
+                notificador.fase(FASE_CODIFICANDO)
+                codificado = self._codificar_imagen(pixeles, ancho, alto, esquema)
+                notificador.terminar()
 
-            # Aplicar RLE
-            pixeles_comprimidos = self._aplicar_rle(pixeles)
+                # Guardar datos comprimidos en formato .rle
+                notificador.fase(FASE_ESCRIBIENDO)
+                with salida_atomica(archivo_salida) as temporal, open(temporal, 'wb') as archivo:
+                    self._escribir_rle(archivo, *codificado, ancho, alto, imagen)
+                notificador.terminar()
+
+            self.ultima_salida = archivo_salida
+            return archivo_salida
+
+        except OperacionCancelada:
+            raise
+        except Exception as e:
+            raise Exception(f"Error en compresión de imagen: {e}")
 
-            # Guardar datos comprimidos en formato .rle
-            nombre_base = os.path.splitext(archivo_imagen)[0]
+    def comprimir_por_franjas(self, archivo_imagen, alto_franja=ALTO_FRANJA, esquema=None, progreso=None,
+                              directorio_salida=None):
+        """
+        Comprime la imagen por franjas horizontales independientes, cada una
+        con su propio esquema, sin construir nunca los arreglos de la imagen
+        completa. El índice de franjas permite decodificarlas por separado.
+        """
+        try:
+            nombre_base = ruta_base_salida(archivo_imagen, directorio_salida)
             archivo_salida = nombre_base + "_comprimido.rle"
 
-            self._guardar_comprimido(archivo_salida, pixeles_comprimidos, ancho, alto, modo)
+            with compresion_con_cache(self.cache, archivo_imagen, archivo_salida, "rle_franjas",
+                                      alto_franja=alto_franja, esquema=esquema,
+                                      version=VERSION_RLE) as en_cache:
+                if en_cache:
+                    self.ultima_salida = archivo_salida
+                    return archivo_salida
+
+                # Cada franja se recorta antes de convertirla, así nunca hay
+                # una copia convertida de la imagen completa
+                imagen = Image.open(archivo_imagen)
+                modo = self._modo_preparado(imagen)
+                ancho, alto = imagen.size
+                cantidad_franjas = -(-alto // alto_franja)
+                notificador = NotificadorProgreso(progreso, ancho * alto * Image.getmodebands(modo))
+                notificador.fase(FASE_CODIFICANDO)
+
+                with salida_atomica(archivo_salida) as temporal, open(temporal, 'wb') as archivo:
+                    archivo.write(struct.pack(FORMATO_ENCABEZADO_FRANJAS, MAGIA_FRANJAS, VERSION_RLE,
+                                              modo.encode('ascii'), ancho, alto, alto_franja,
+                                              cantidad_franjas))
+                    # Reservar el índice y completarlo al final
+                    posicion_indice = archivo.tell()
+                    archivo.write(bytes(struct.calcsize(FORMATO_INDICE_FRANJA) * cantidad_franjas))
+
+                    indice = []
+                    for fila in range(0, alto, alto_franja):
+                        franja = self._preparar_imagen(
+                            imagen.crop((0, fila, ancho, min(fila + alto_franja, alto))))
+                        alto_actual = franja.size[1]
+                        pixeles = self._pixeles(franja)
+                        codificado = self._codificar_imagen(pixeles, ancho, alto_actual, esquema)
+
+                        inicio = archivo.tell()
+                        self._escribir_rle(archivo, *codificado, ancho, alto_actual, franja)
+                        indice.append((inicio, archivo.tell() - inicio))
+                        notificador.avanzar(pixeles.nbytes)
+
+                    archivo.seek(posicion_indice)
+                    for entrada in indice:
+                        archivo.write(struct.pack(FORMATO_INDICE_FRANJA, *entrada))
+                notificador.terminar()
+
             self.ultima_salida = archivo_salida
             return archivo_salida
 
+        except OperacionCancelada:
+            raise
         except Exception as e:
             raise Exception(f"Error en compresión de imagen: {e}")
 
+    def _preparar_imagen(self, imagen):
+        """
+        Conserva el modo de la imagen si es uno de los nativos (de 1 a 4
+        bytes por píxel); los demás se convierten a RGB, o a RGBA si tienen alfa
+        """
+        modo = self._modo_preparado(imagen)
+        return imagen if modo == imagen.mode else imagen.convert(modo)
+
+    def _modo_preparado(self, imagen):
+        """Modo que tendrá la imagen después de _preparar_imagen, sin convertirla"""
+        if imagen.mode in MODOS_NATIVOS:
+            return imagen.mode
+        if "A" in imagen.getbands() or "transparency" in imagen.info:
+            return "RGBA"
+        return "RGB"
+
+    def _pixeles(self, imagen):
+        """Devuelve los píxeles como un arreglo uint8 (ancho*alto, canales)"""
+        if imagen.mode == "1":
+            # Un byte por píxel (0 o 255) en lugar de booleanos
+            imagen = imagen.convert("L")
+        return np.asarray(imagen, dtype=np.uint8).reshape(-1, len(imagen.getbands()))
+
+    def _codificar_imagen(self, pixeles, ancho, alto, esquema):
+        """
+        Aplica RLE con el esquema indicado o, si es None, con el más pequeño
+        según la muestra. Devuelve (esquema, datos del esquema, secciones).
+        """
+        if esquema is None:
+            candidatos = self._ordenar_esquemas(pixeles, ancho, alto)
+        elif esquema in ESQUEMAS:
+            candidatos = [esquema]
+        else:
+            raise ValueError(f"Esquema de RLE desconocido: {esquema}")
+
+        for candidato in candidatos:
+            codificado = self._codificar_esquema(pixeles, ancho, alto, candidato)
+            if codificado is not None:
+                return (candidato, *codificado)
+        raise ValueError("El esquema de paleta necesita una imagen en color con 256 colores o menos")
+
+    def _ordenar_esquemas(self, pixeles, ancho, alto):
+        """
+        Estima el tamaño de cada esquema sobre una muestra de franjas de filas
+        y devuelve los esquemas aplicables del más pequeño al más grande
+        """
+        filas = pixeles.reshape(alto, ancho, -1)
+        if alto > FILAS_MUESTRA:
+            inicios = np.linspace(0, alto - FILAS_FRANJA_MUESTRA,
+                                  FILAS_MUESTRA // FILAS_FRANJA_MUESTRA).astype(np.int64)
+            filas = np.concatenate([filas[inicio:inicio + FILAS_FRANJA_MUESTRA] for inicio in inicios])
+        muestra = filas.reshape(-1, filas.shape[2])
+
+        tamanos = {}
+        for esquema in ESQUEMAS:
+            codificado = self._codificar_esquema(muestra, ancho, len(filas), esquema)
+            if codificado is not None:
+                tamanos[esquema] = self._tamano_codificado(*codificado)
+        return sorted(tamanos, key=tamanos.get)
+
+    def _codificar_esquema(self, pixeles, ancho, alto, esquema):
+        """
+        Aplica RLE según el esquema. Devuelve los datos propios del esquema y
+        la lista de secciones (valores, longitudes), o None si no es aplicable.
+        """
+        canales = pixeles.shape[1]
+        if esquema == ESQUEMA_PIXEL:
+            return b"", [self._aplicar_rle(pixeles)]
+
+        if esquema == ESQUEMA_PLANAR:
+            return b"", [self._aplicar_rle(pixeles[:, canal:canal + 1]) for canal in range(canales)]
+
+        if esquema == ESQUEMA_DELTA_FILAS:
+            filas = pixeles.reshape(alto, ancho * canales)
+            diferencias = filas.copy()
+            np.bitwise_xor(diferencias[1:], filas[:-1], out=diferencias[1:])
+            return b"", [self._aplicar_rle(diferencias.reshape(-1, canales))]
+
+        # ESQUEMA_PALETA: con un solo canal los píxeles ya ocupan un byte
+        if canales == 1:
+            return None
+        _, primeros, indices = np.unique(self._empaquetar_pixeles(pixeles),
+                                         return_index=True, return_inverse=True)
+        if len(primeros) > 256:
+            return None
+        paleta = pixeles[primeros]
+        datos_paleta = struct.pack(FORMATO_PALETA, len(paleta)) + paleta.tobytes()
+        return datos_paleta, [self._aplicar_rle(indices.astype(np.uint8).reshape(-1, 1))]
+
+    def _tamano_codificado(self, datos_esquema, secciones):
+        """Calcula los bytes que ocuparían los datos del esquema y las secciones"""
+        tamano = len(datos_esquema)
+        for valores, longitudes in secciones:
+            tamano += (struct.calcsize(FORMATO_SECCION) + valores.size
+                       + len(codificar_varints(longitudes)))
+        return tamano
+
     def _aplicar_rle(self, pixeles):
-        """Aplica Run-Length Encoding a la lista de píxeles"""
-        if not pixeles:
-            return []
-        comprimido = []
-        actual = pixeles[0]
-        contador = 1
-
-        for pixel in pixeles[1:]:
-            if pixel == actual:
-                contador += 1
-            else:
-                comprimido.append((actual, contador))
-                actual = pixel
-                contador = 1
-
-        comprimido.append((actual, contador))
-        return comprimido
-
-    def _guardar_comprimido(self, archivo_salida, pixeles_comprimidos, ancho, alto, modo):
-        """Guarda los datos RLE en formato .rle legible"""
-        with open(archivo_salida, 'w', encoding='utf-8') as archivo:
-            archivo.write(f"ANCHO:{ancho}\n")
-            archivo.write(f"ALTO:{alto}\n")
-            archivo.write(f"MODO:{modo}\n")
-            archivo.write("DATOS_RLE:\n")
-            for (pixel, contador) in pixeles_comprimidos:
-                pixel_str = ','.join(map(str, pixel))
-                archivo.write(f"({pixel_str}):{contador}\n")
+        """
+        Aplica Run-Length Encoding vectorizado al arreglo de píxeles.
+        Devuelve los valores de cada corrida (corridas, canales) y sus longitudes.
+        """
+        if len(pixeles) == 0:
+            return pixeles[:0], np.zeros(0, dtype=np.int64)
+
+        # Las corridas empiezan donde el píxel empaquetado cambia
+        empaquetados = self._empaquetar_pixeles(pixeles)
+        inicios = np.concatenate(([0], np.flatnonzero(np.diff(empaquetados)) + 1))
+        longitudes = np.diff(np.append(inicios, len(empaquetados)))
+        return pixeles[inicios], longitudes
+
+    def _empaquetar_pixeles(self, pixeles):
+        """Empaqueta cada píxel de hasta 4 canales de 8 bits en un uint32"""
+        empaquetados = np.zeros(len(pixeles), dtype=np.uint32)
+        for canal in range(pixeles.shape[1]):
+            empaquetados <<= 8
+            empaquetados |= pixeles[:, canal]
+        return empaquetados
+
+    def _escribir_rle(self, archivo, esquema, datos_esquema, secciones, ancho, alto, imagen):
+        """Escribe los datos RLE en formato binario .rle v2"""
+        total_corridas = sum(len(longitudes) for _, longitudes in secciones)
+        archivo.write(struct.pack(FORMATO_ENCABEZADO, MAGIA_RLE, VERSION_RLE, esquema,
+                                  imagen.mode.encode('ascii'), ancho, alto, total_corridas))
+        if imagen.mode == "P":
+            paleta = self._paleta_imagen(imagen)
+            cantidad_colores = len(paleta) // len(MODO_PALETA_IMAGEN)
+            archivo.write(struct.pack(FORMATO_PALETA, cantidad_colores) + paleta)
+        archivo.write(datos_esquema)
+        for valores, longitudes in secciones:
+            self._escribir_seccion(archivo, valores, longitudes)
+
+    def _paleta_imagen(self, imagen):
+        """Devuelve la paleta RGBA de una imagen en modo P, incluida su transparencia"""
+        paleta = bytearray(imagen.getpalette(MODO_PALETA_IMAGEN))
+        transparencia = imagen.info.get("transparency")
+        if isinstance(transparencia, int):
+            transparencia = {transparencia: 0}.items()
+        elif isinstance(transparencia, bytes):
+            transparencia = enumerate(transparencia)
+        else:
+            transparencia = ()
+        canales = len(MODO_PALETA_IMAGEN)
+        for indice, alfa in transparencia:
+            if indice * canales + 3 < len(paleta):
+                paleta[indice * canales + 3] = alfa
+        return bytes(paleta)
+
+    def _escribir_seccion(self, archivo, valores, longitudes):
+        """Escribe los valores de las corridas empaquetados y sus longitudes en varint"""
+        longitudes_varint = codificar_varints(longitudes)
+        archivo.write(struct.pack(FORMATO_SECCION, valores.shape[1], len(longitudes),
+                                  len(longitudes_varint)))
+        archivo.write(np.ascontiguousarray(valores, dtype=np.uint8).tobytes())
+        archivo.write(longitudes_varint.tobytes())
 
     # ======================================================
     # DESCOMPRESIÓN
     # ======================================================
-    def descomprimir(self, archivo_rle):
+    def descomprimir(self, archivo_rle, hilos=None, progreso=None, directorio_salida=None):
+        """
+        Reconstruye la imagen de un archivo .rle y la guarda como PNG. La
+        función `progreso` recibe EventoProgreso con los bytes de píxeles reconstruidos.
+        """
         try:
-            with open(archivo_rle, 'r', encoding='utf-8') as archivo:
-                lineas = archivo.readlines()
-
-            # Extraer metadatos
-            ancho = int(lineas[0].split(':')[1])
-            alto = int(lineas[1].split(':')[1])
-            modo = lineas[2].split(':')[1].strip()
-
-            # Saltar encabezados y quedarse con los datos RLE
-            datos_rle = []
-            for linea in lineas[4:]:
-                linea = linea.strip()
-                if not linea:
-                    continue
-                partes = linea.split(" ")
-                for parte in partes:
-                    if not parte:
-                        continue
-                    pixel_str, contador_str = parte.split(':')
-                    contador = int(contador_str)
-
-                    # Determinar si es RGB o escala de grises
-                    if pixel_str.startswith("(") and pixel_str.endswith(")"):
-                        # RGB: quitar paréntesis y convertir a tupla
-                        valores = tuple(map(int, pixel_str[1:-1].split(',')))
-                        datos_rle.append((valores, contador))
-                    else:
-                        # Escala de grises
-                        datos_rle.append((int(pixel_str), contador))
-
-            # Reconstruir lista de píxeles
-            pixeles = []
-            for pixel, repeticiones in datos_rle:
-                pixeles.extend([pixel] * repeticiones)
-
-            # Validar cantidad de píxeles
-            if len(pixeles) != ancho * alto:
-                raise Exception(
-                    f"La cantidad de píxeles ({len(pixeles)}) no coincide con el tamaño de la imagen ({ancho * alto}).")
-
-            # Crear imagen y guardarla
-            imagen = Image.new(modo, (ancho, alto))
-            imagen.putdata(pixeles)
-
-            nombre_base = os.path.splitext(archivo_rle)[0]
+            with open(archivo_rle, 'rb') as archivo:
+                magia = archivo.read(len(MAGIA_RLE))
+            notificador = NotificadorProgreso(progreso)
+
+            # Los .rle de texto anteriores al formato v2 se siguen aceptando
+            if magia == MAGIA_RLE:
+                imagen = self._leer_rle_binario(archivo_rle, notificador)
+            elif magia == MAGIA_FRANJAS:
+                imagen = self._leer_rle_franjas(archivo_rle, hilos, notificador)
+            else:
+                notificador.fase(FASE_DECODIFICANDO)
+                imagen = self._leer_rle_texto(archivo_rle)
+            notificador.terminar()
+
+            nombre_base = ruta_base_salida(archivo_rle, directorio_salida)
             archivo_salida = nombre_base + "_reconstruida.png"
-            imagen.save(archivo_salida)
+            notificador.fase(FASE_ESCRIBIENDO)
+            with salida_atomica(archivo_salida) as temporal:
+                imagen.save(temporal, format="PNG")
+            notificador.terminar()
 
             # Guardar ruta para visualizar
             self.ultima_salida = archivo_salida
 
             return archivo_salida
 
+        except OperacionCancelada:
+            raise
         except Exception as e:
-            raise Exception(f"Error en descompresión: {e}")
\ No newline at end of file
+            raise Exception(f"Error en descompresión: {e}")
+
+    def descomprimir_franja(self, archivo_rle, numero_franja):
+        """
+        Decodifica una sola franja de un archivo comprimido por franjas y la
+        devuelve como imagen, sin tocar el resto del archivo
+        """
+        try:
+            with open(archivo_rle, 'rb') as archivo, \
+                    mmap.mmap(archivo.fileno(), 0, access=mmap.ACCESS_READ) as mapa:
+                _, indice = self._leer_indice_franjas(mapa)
+                if not 0 <= numero_franja < len(indice):
+                    raise ValueError(f"El archivo no tiene la franja {numero_franja}")
+                decodificado = self._decodificar_rle(mapa, indice[numero_franja][0])
+            return self._crear_imagen(*decodificado)
+
+        except Exception as e:
+            raise Exception(f"Error en descompresión: {e}")
+
+    def _leer_rle_binario(self, archivo_rle, notificador):
+        """
+        Reconstruye la imagen de un archivo .rle v2. El archivo se mapea en
+        memoria y las corridas se expanden directamente en el búfer de la imagen.
+        """
+        with open(archivo_rle, 'rb') as archivo, \
+                mmap.mmap(archivo.fileno(), 0, access=mmap.ACCESS_READ) as mapa:
+            _, _, _, modo, ancho, alto, _ = struct.unpack_from(FORMATO_ENCABEZADO, mapa, 0)
+            canales = Image.getmodebands(modo.rstrip(b"\0").decode('ascii'))
+            notificador.fase(FASE_DECODIFICANDO, ancho * alto * canales)
+            decodificado = self._decodificar_rle(mapa, 0, notificador=notificador)
+        return self._crear_imagen(*decodificado)
+
+    def _leer_indice_franjas(self, mapa):
+        """
+        Lee el encabezado y el índice de un archivo por franjas. Devuelve
+        (modo, ancho, alto, filas por franja) y la lista de (posición, tamaño).
+        """
+        _, version, modo, ancho, alto, alto_franja, cantidad_franjas = \
+            struct.unpack_from(FORMATO_ENCABEZADO_FRANJAS, mapa, 0)
+        if version != VERSION_RLE:
+            raise ValueError("Versión de .rle no soportada")
+        posicion = struct.calcsize(FORMATO_ENCABEZADO_FRANJAS)
+        tamano_entrada = struct.calcsize(FORMATO_INDICE_FRANJA)
+        indice = [struct.unpack_from(FORMATO_INDICE_FRANJA, mapa, posicion + i * tamano_entrada)
+                  for i in range(cantidad_franjas)]
+        return (modo.rstrip(b"\0").decode('ascii'), ancho, alto, alto_franja), indice
+
+    def _leer_rle_franjas(self, archivo_rle, hilos, notificador):
+        """
+        Reconstruye una imagen comprimida por franjas decodificando las franjas
+        en paralelo, cada una directamente en su parte del búfer de la imagen
+        """
+        with open(archivo_rle, 'rb') as archivo, \
+                mmap.mmap(archivo.fileno(), 0, access=mmap.ACCESS_READ) as mapa:
+            (modo, ancho, alto, alto_franja), indice = self._leer_indice_franjas(mapa)
+            notificador.fase(FASE_DECODIFICANDO, ancho * alto * Image.getmodebands(modo))
+            bufer = np.empty((ancho * alto, Image.getmodebands(modo)), dtype=np.uint8)
+
+            def decodificar_franja(numero):
+                inicio = numero * alto_franja * ancho
+                destino = bufer[inicio:inicio + alto_franja * ancho]
+                modo_franja, ancho_franja, alto_actual, _, paleta = \
+                    self._decodificar_rle(mapa, indice[numero][0], destino, notificador)
+                if modo_franja != modo or ancho_franja != ancho:
+                    raise ValueError(f"La franja {numero} no coincide con la imagen")
+                return alto_actual, paleta
+
+            # NumPy libera el GIL al expandir las corridas, así que los hilos
+            # avanzan en paralelo y escriben sobre el mismo búfer sin copias
+            with ThreadPoolExecutor(max_workers=hilos) as ejecutor:
+                resultados = list(ejecutor.map(decodificar_franja, range(len(indice))))
+            if sum(filas for filas, _ in resultados) != alto:
+                raise ValueError("Las franjas no cubren toda la imagen")
+
+        paleta = resultados[0][1] if resultados else None
+        return self._crear_imagen(modo, ancho, alto, bufer, paleta)
+
+    def _decodificar_rle(self, mapa, inicio, bufer=None, notificador=None):
+        """
+        Decodifica el flujo .rle v2 que empieza en la posición `inicio` del
+        búfer mapeado. Las corridas se expanden sobre `bufer` (o uno nuevo) y
+        los píxeles reconstruidos se informan al notificador.
+        Devuelve el modo, el ancho, el alto, el búfer de píxeles y la paleta
+        de la imagen (solo en modo P).
+        """
+        notificador = notificador or NotificadorProgreso()
+        _, version, esquema, modo, ancho, alto, _ = struct.unpack_from(FORMATO_ENCABEZADO, mapa, inicio)
+        if version != VERSION_RLE or esquema not in ESQUEMAS:
+            raise ValueError("Versión o esquema de .rle no soportado")
+        modo = modo.rstrip(b"\0").decode('ascii')
+        canales = Image.getmodebands(modo)
+        posicion = inicio + struct.calcsize(FORMATO_ENCABEZADO)
+
+        paleta_imagen = None
+        if modo == "P":
+            cantidad_colores, = struct.unpack_from(FORMATO_PALETA, mapa, posicion)
+            posicion += struct.calcsize(FORMATO_PALETA)
+            tamano_paleta = cantidad_colores * len(MODO_PALETA_IMAGEN)
+            paleta_imagen = bytes(mapa[posicion:posicion + tamano_paleta])
+            posicion += tamano_paleta
+
+        paleta = None
+        if esquema == ESQUEMA_PALETA:
+            cantidad_colores, = struct.unpack_from(FORMATO_PALETA, mapa, posicion)
+            posicion += struct.calcsize(FORMATO_PALETA)
+            paleta = np.frombuffer(mapa[posicion:posicion + cantidad_colores * canales],
+                                   dtype=np.uint8).reshape(cantidad_colores, canales)
+            posicion += cantidad_colores * canales
+
+        if bufer is None:
+            bufer = np.empty((ancho * alto, canales), dtype=np.uint8)
+        elif bufer.shape[1] != canales or len(bufer) < ancho * alto:
+            raise ValueError("El búfer destino no coincide con la imagen")
+        bufer = bufer[:ancho * alto]
+
+        if esquema == ESQUEMA_PLANAR:
+            destinos = [bufer[:, canal:canal + 1] for canal in range(canales)]
+        elif esquema == ESQUEMA_PALETA:
+            indices = np.empty((ancho * alto, 1), dtype=np.uint8)
+            destinos = [indices]
+        else:
+            destinos = [bufer]
+
+        # Vistas sobre el archivo mapeado, sin copiar los valores
+        datos = np.frombuffer(mapa, dtype=np.uint8)
+        valores = None
+        try:
+            for destino in destinos:
+                valores, longitudes, posicion = self._leer_seccion(mapa, datos, posicion)
+                if valores.shape[1] != destino.shape[1]:
+                    raise ValueError("Las secciones del .rle no coinciden con el modo de la imagen")
+                total = int(longitudes.sum())
+                if total != ancho * alto:
+                    raise Exception(
+                        f"La cantidad de píxeles ({total}) no coincide con el tamaño de la imagen ({ancho * alto}).")
+                self._expandir_corridas(valores, longitudes, destino, notificador, canales / len(destinos))
+        finally:
+            # Las vistas deben liberarse antes de cerrar el mapa
+            datos = valores = None
+
+        if esquema == ESQUEMA_PALETA:
+            np.take(paleta, indices[:, 0], axis=0, out=bufer)
+        elif esquema == ESQUEMA_DELTA_FILAS:
+            filas = bufer.reshape(alto, ancho * canales)
+            np.bitwise_xor.accumulate(filas, axis=0, out=filas)
+
+        return modo, ancho, alto, bufer, paleta_imagen
+
+    def _crear_imagen(self, modo, ancho, alto, bufer, paleta_imagen):
+        """Crea la imagen en su modo original a partir del búfer de píxeles"""
+        if modo == "1":
+            # Los píxeles se guardaron como bytes 0/255
+            imagen = Image.frombuffer("L", (ancho, alto), bufer, 'raw', "L", 0, 1)
+            return imagen.convert("1", dither=Image.Dither.NONE)
+        imagen = Image.frombuffer(modo, (ancho, alto), bufer, 'raw', modo, 0, 1)
+        if paleta_imagen is not None:
+            imagen.putpalette(paleta_imagen, MODO_PALETA_IMAGEN)
+        return imagen
+
+    def _leer_seccion(self, mapa, datos, posicion):
+        """
+        Lee una sección del archivo mapeado. Devuelve una vista de los valores,
+        las longitudes decodificadas y la posición siguiente a la sección.
+        """
+        canales, cantidad, bytes_longitudes = struct.unpack_from(FORMATO_SECCION, mapa, posicion)
+        posicion += struct.calcsize(FORMATO_SECCION)
+        valores = datos[posicion:posicion + cantidad * canales].reshape(cantidad, canales)
+        posicion += cantidad * canales
+        # Las longitudes se copian: ocupan poco y así ninguna vista
+        # queda retenida si la decodificación falla
+        leido = leer_varints(mapa[posicion:posicion + bytes_longitudes], cantidad)
+        if leido is None or leido[1] != bytes_longitudes:
+            raise ValueError("Las longitudes de las corridas están dañadas")
+        return valores, leido[0], posicion + bytes_longitudes
+
+    def _expandir_corridas(self, valores, longitudes, destino, notificador, bytes_por_pixel):
+        """
+        Expande las corridas con np.repeat sobre el búfer destino, por tandas.
+        Cada píxel expandido cuenta como bytes_por_pixel bytes de la imagen: las
+        secciones de un mismo flujo se reparten los bytes de cada píxel.
+        """
+        inicio = 0
+        for primera in range(0, len(longitudes), CORRIDAS_POR_TANDA):
+            tanda = longitudes[primera:primera + CORRIDAS_POR_TANDA]
+            fin = inicio + int(tanda.sum())
+            destino[inicio:fin] = np.repeat(valores[primera:primera + CORRIDAS_POR_TANDA], tanda, axis=0)
+            notificador.avanzar((fin - inicio) * bytes_por_pixel)
+            inicio = fin
+
+    def _leer_rle_texto(self, archivo_rle):
+        """Reconstruye la imagen de un archivo .rle de texto (una corrida por línea)"""
+        with open(archivo_rle, 'r', encoding='utf-8') as archivo:
+            lineas = archivo.readlines()
+
+        # Extraer metadatos
+        ancho = int(lineas[0].split(':')[1])
+        alto = int(lineas[1].split(':')[1])
+        modo = lineas[2].split(':')[1].strip()
+
+        # Saltar encabezados y quedarse con los datos RLE
+        datos_rle = []
+        for linea in lineas[4:]:
+            linea = linea.strip()
+            if not linea:
+                continue
+            partes = linea.split(" ")
+            for parte in partes:
+                if not parte:
+                    continue
+                pixel_str, contador_str = parte.split(':')
+                contador = int(contador_str)
+
+                # Determinar si es RGB o escala de grises
+                if pixel_str.startswith("(") and pixel_str.endswith(")"):
+                    # RGB: quitar paréntesis y convertir a tupla
+                    valores = tuple(map(int, pixel_str[1:-1].split(',')))
+                    datos_rle.append((valores, contador))
+                else:
+                    # Escala de grises
+                    datos_rle.append((int(pixel_str), contador))
+
+        # Reconstruir lista de píxeles
+        pixeles = []
+        for pixel, repeticiones in datos_rle:
+            pixeles.extend([pixel] * repeticiones)
+
+        # Validar cantidad de píxeles
+        if len(pixeles) != ancho * alto:
+            raise Exception(
+                f"La cantidad de píxeles ({len(pixeles)}) no coincide con el tamaño de la imagen ({ancho * alto}).")
+
+        # Crear imagen
+        imagen = Image.new(modo, (ancho, alto))
+        imagen.putdata(pixeles)
+        return imagen
\ No newline at end of file
@@ -1,85 +1,1175 @@
 # compresor_texto.py
 import heapq
+import io
 import os
+import struct
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 
-class NodoHuffman:
-    def __init__(self, caracter, frecuencia):
-        self.caracter = caracter
-        self.frecuencia = frecuencia
-        self.izquierda = None
-        self.derecha = None
-        
-    def __lt__(self, otro):
-        return self.frecuencia < otro.frecuencia
+import numpy as np
+
+from cache_compresion import compresion_con_cache
+from flujo_bits import (LARGO_MAXIMO_VARINT, EscritorBits, LectorBits, codificar_varints, empaquetar_codigos,
+                        leer_varints)
+from progreso import (FASE_ARBOL, FASE_CODIFICANDO, FASE_CONTANDO, FASE_DECODIFICANDO,
+                      NotificadorProgreso, OperacionCancelada)
+from utilidades import crear_directorio_si_no_existe, mapear_en_orden, ruta_base_salida, salida_atomica
+
+# Formato binario del archivo .bin:
+#   encabezado | tabla de códigos | bits empaquetados
+MAGIA = b"HUF"
+VERSION = 1
+# magia, versión, modo, cantidad de símbolos codificados, bits de relleno,
+# cantidad de símbolos de la tabla
+FORMATO_ENCABEZADO = "<3sBBQBI"
+# Modo texto: el alfabeto son los caracteres Unicode del archivo y la tabla
+# guarda el punto de código de cada uno junto a la longitud de su código
+MODO_TEXTO = "texto"
+FORMATO_SIMBOLO = "<IB"
+# Modo binario: el alfabeto son los 256 valores de un byte y la tabla es
+# un byte de longitud por valor (0 si el valor no aparece)
+MODO_BINARIO = "binario"
+TAMANO_ALFABETO_BINARIO = 256
+CODIGOS_MODO = {MODO_TEXTO: 0, MODO_BINARIO: 1}
+# Longitud máxima de un código Huffman
+LONGITUD_MAXIMA = 15
+# Bits que resuelve cada consulta a la tabla de decodificación
+BITS_TABLA = 11
+# Caracteres o bytes que se procesan por bloque al leer el archivo
+TAMANO_BLOQUE = 1 << 18
+
+# Contenedor de bloques independientes para compresión en paralelo:
+#   encabezado | índice de bloques | bloques
+# Cada bloque es un flujo .bin completo en modo binario con su propia tabla.
+MAGIA_BLOQUES = b"HUB"
+# magia, versión, tamaño original, tamaño de bloque, cantidad de bloques
+FORMATO_ENCABEZADO_BLOQUES = "<3sBQII"
+# posición del bloque en el archivo, tamaño comprimido, tamaño original
+FORMATO_INDICE = "<QQI"
+TAMANO_BLOQUE_PARALELO = 1 << 21
+
+# Diccionarios: tablas de códigos entrenadas con un corpus de muestra y
+# compartidas por muchos archivos pequeños, que así no guardan su tabla.
+# El alfabeto son los 256 bytes más un símbolo de escape: un byte que no
+# apareció en las muestras se codifica como el escape seguido de sus 8 bits.
+#   diccionario = encabezado | longitud del código de cada símbolo
+#   archivo .bin = encabezado | bits empaquetados
+MAGIA_TABLA = b"HUT"
+# magia, versión, identificador del diccionario
+FORMATO_ENCABEZADO_TABLA = "<3sBI"
+MAGIA_DICCIONARIO = b"HUD"
+# magia, versión, identificador del diccionario, cantidad de bytes codificados
+FORMATO_ENCABEZADO_DICCIONARIO = "<3sBIQ"
+SIMBOLO_ESCAPE = TAMANO_ALFABETO_BINARIO
+EXTENSION_DICCIONARIO = ".dic"
+DIRECTORIO_DICCIONARIOS = os.path.join(os.path.expanduser("~"), ".local", "share", "compresor_archivos",
+                                       "diccionarios")
+
+# Modo adaptativo: se codifica en una sola pasada, sin conocer las
+# frecuencias de antemano. Codificador y decodificador parten de la misma
+# tabla uniforme y la reconstruyen con las frecuencias acumuladas cada vez
+# que pasan INTERVALO_ADAPTATIVO bytes, así que la tabla nunca se guarda.
+#   encabezado | segmentos | segmento final vacío
+#   segmento = bytes originales, bytes comprimidos | bits empaquetados
+# Los dos tamaños del segmento van en varint (7 bits por byte, el bit alto
+# indica que sigue otro byte) y el segmento final es un único 0.
+MAGIA_ADAPTATIVO = b"HUA"
+VERSION_ADAPTATIVO = 1
+# magia, versión, bytes entre reconstrucciones de la tabla
+FORMATO_ENCABEZADO_ADAPTATIVO = "<3sBI"
+INTERVALO_ADAPTATIVO = 1 << 15
+# Bytes que el codificador junta antes de formar un segmento, para que las
+# escrituras pequeñas (una línea de log) no paguen cada una su encabezado
+# y su relleno; vaciar fuerza a codificar lo pendiente
+TAMANO_MINIMO_SEGMENTO = 1 << 12
+# Al superar este total las frecuencias se reducen a la mitad para que
+# la tabla siga los cambios del contenido
+MAXIMO_FRECUENCIAS_ADAPTATIVO = 1 << 22
+
+class ArbolHuffman:
+    """
+    Árbol de Huffman guardado en arreglos paralelos en lugar de un objeto
+    por nodo. Las hojas son los índices 0..n-1, en el orden de `simbolos`,
+    y cada nodo interno se agrega al final al combinar dos nodos, así que
+    un padre siempre tiene un índice mayor que sus hijos y la raíz es el último.
+    """
+    __slots__ = ("simbolos", "peso", "padre", "izquierda", "derecha")
+    
+    def __init__(self, simbolos, pesos):
+        self.simbolos = simbolos
+        self.peso = list(pesos)
+        self.padre = [-1] * len(simbolos)
+        self.izquierda = [-1] * len(simbolos)
+        self.derecha = [-1] * len(simbolos)
+    
+    def combinar(self, izquierda, derecha):
+        """Crea un nodo interno con los dos nodos indicados y devuelve su índice"""
+        nodo = len(self.peso)
+        self.peso.append(self.peso[izquierda] + self.peso[derecha])
+        self.padre.append(-1)
+        self.izquierda.append(izquierda)
+        self.derecha.append(derecha)
+        self.padre[izquierda] = self.padre[derecha] = nodo
+        return nodo
+    
+    def profundidades(self):
+        """
+        Devuelve la profundidad de cada hoja. Se recorren los nodos desde la
+        raíz hacia atrás: el padre de cada nodo ya tiene su profundidad.
+        """
+        profundidad = [0] * len(self.peso)
+        for nodo in range(len(self.peso) - 2, -1, -1):
+            profundidad[nodo] = profundidad[self.padre[nodo]] + 1
+        return profundidad[:len(self.simbolos)]
 
 class CompresorTexto:
-    def __init__(self):
+    def __init__(self, cache=None, directorio_diccionarios=DIRECTORIO_DICCIONARIOS):
         self.codigos = {}
+        # CacheCompresion opcional: si el archivo ya se comprimió igual se reutiliza
+        self.cache = cache
+        self.directorio_diccionarios = directorio_diccionarios
+        # Diccionarios ya cargados, por identificador
+        self._diccionarios = {}
         
-    def comprimir(self, archivo_entrada):
+    def comprimir(self, archivo_entrada, modo=MODO_TEXTO, progreso=None, directorio_salida=None):
         """
-        Comprime un archivo de texto usando el algoritmo de Huffman
+        Comprime un archivo usando el algoritmo de Huffman. En modo texto el
+        archivo debe ser UTF-8; en modo binario se acepta cualquier archivo.
+        La función `progreso` recibe EventoProgreso con los bytes leídos.
         """
         try:
-            # Leer el archivo de texto
-            with open(archivo_entrada, 'r', encoding='utf-8') as archivo:
-                texto = archivo.read()
+            if modo not in CODIGOS_MODO:
+                raise ValueError(f"Modo de compresión desconocido: {modo}")
             
-            if not texto:
-                raise ValueError("El archivo está vacío")
+            # Crear archivo comprimido .bin
+            nombre_base = ruta_base_salida(archivo_entrada, directorio_salida)
+            archivo_salida = nombre_base + "_comprimido.bin"
             
-            # Generar árbol de Huffman y códigos
-            arbol = self._construir_arbol_huffman(texto)
-            self.codigos = {}
-            self._generar_codigos(arbol, "")
+            with compresion_con_cache(self.cache, archivo_entrada, archivo_salida, "huffman", modo=modo,
+                                      version=VERSION) as en_cache:
+                if en_cache:
+                    return archivo_salida
+                notificador = NotificadorProgreso(progreso, os.path.getsize(archivo_entrada))
+                
+                # Primera pasada: contar frecuencias bloque a bloque
+                notificador.fase(FASE_CONTANDO)
+                frecuencia = self._contar_frecuencias(archivo_entrada, modo, notificador)
+                
+                if not frecuencia:
+                    raise ValueError("El archivo está vacío")
+                
+                # Segunda pasada: codificar bloque a bloque escribiendo los bytes completos
+                with self._abrir_entrada(archivo_entrada, modo) as entrada, \
+                        salida_atomica(archivo_salida) as temporal, open(temporal, 'wb') as salida:
+                    bloques = self._leer_bloques(entrada, modo, notificador)
+                    self._codificar_flujo(salida, frecuencia, modo, bloques, notificador)
+                notificador.terminar()
+                
+            return archivo_salida
             
-            # Codificar el texto
-            texto_codificado = "".join(self.codigos[caracter] for caracter in texto)
+        except OperacionCancelada:
+            raise
+        except Exception as e:
+            raise Exception(f"Error en compresión de texto: {e}")
+    
+    def comprimir_paralelo(self, archivo_entrada, tamano_bloque=TAMANO_BLOQUE_PARALELO, procesos=None,
+                           progreso=None, directorio_salida=None):
+        """
+        Comprime cualquier archivo dividiéndolo en bloques independientes, cada
+        uno con su propia tabla Huffman, que se codifican en un grupo de procesos
+        """
+        try:
+            tamano_original = os.path.getsize(archivo_entrada)
+            if tamano_original == 0:
+                raise ValueError("El archivo está vacío")
+            cantidad_bloques = -(-tamano_original // tamano_bloque)
+            procesos = procesos or os.cpu_count() or 1
             
-            # Crear archivo comprimido .bin
-            nombre_base = os.path.splitext(archivo_entrada)[0]
+            nombre_base = ruta_base_salida(archivo_entrada, directorio_salida)
             archivo_salida = nombre_base + "_comprimido.bin"
             
-            # Guardar solo los bits en archivo .bin
-            with open(archivo_salida, 'w', encoding='utf-8') as archivo:
-                archivo.write(texto_codificado)
-            
+            with compresion_con_cache(self.cache, archivo_entrada, archivo_salida, "huffman_bloques",
+                                      tamano_bloque=tamano_bloque, version=VERSION) as en_cache:
+                if en_cache:
+                    return archivo_salida
+                notificador = NotificadorProgreso(progreso, tamano_original)
+                notificador.fase(FASE_CODIFICANDO)
+                
+                with open(archivo_entrada, 'rb') as entrada, \
+                        salida_atomica(archivo_salida) as temporal, open(temporal, 'wb') as salida, \
+                        ProcessPoolExecutor(max_workers=procesos) as ejecutor:
+                    salida.write(struct.pack(FORMATO_ENCABEZADO_BLOQUES, MAGIA_BLOQUES, VERSION,
+                                             tamano_original, tamano_bloque, cantidad_bloques))
+                    # Reservar el índice y completarlo cuando se conozcan los tamaños
+                    posicion_indice = salida.tell()
+                    salida.write(bytes(struct.calcsize(FORMATO_INDICE) * cantidad_bloques))
+                    
+                    indice = []
+                    bloques = iter(lambda: entrada.read(tamano_bloque), b"")
+                    for comprimido, tamano in mapear_en_orden(ejecutor, _comprimir_bloque,
+                                                              bloques, 2 * procesos):
+                        indice.append((salida.tell(), len(comprimido), tamano))
+                        salida.write(comprimido)
+                        notificador.avanzar(tamano)
+                    
+                    salida.seek(posicion_indice)
+                    for entrada_indice in indice:
+                        salida.write(struct.pack(FORMATO_INDICE, *entrada_indice))
+                notificador.terminar()
+                
             return archivo_salida
             
+        except OperacionCancelada:
+            raise
         except Exception as e:
             raise Exception(f"Error en compresión de texto: {e}")
     
-    def _construir_arbol_huffman(self, texto):
+    def _codificar_flujo(self, salida, frecuencia, modo, bloques, notificador):
         """
-        Construye el árbol de Huffman a partir del texto
+        Escribe un flujo .bin completo (encabezado, tabla y bits empaquetados)
+        codificando los bloques recibidos con las frecuencias ya contadas
         """
-        frecuencia = Counter(texto)
-        monticulo = [NodoHuffman(caracter, freq) for caracter, freq in frecuencia.items()]
-        heapq.heapify(monticulo)
+        # Generar árbol de Huffman y códigos canónicos de longitud limitada
+        notificador.fase(FASE_ARBOL)
+        longitudes = self._calcular_longitudes(frecuencia)
+        self.codigos = self._asignar_codigos_canonicos(longitudes)
         
+        # El total de bits se conoce antes de codificar, así que el
+        # encabezado puede escribirse primero
+        cantidad_simbolos = sum(frecuencia.values())
+        total_bits = sum(freq * longitudes[caracter] for caracter, freq in frecuencia.items())
+        relleno = (8 - total_bits % 8) % 8
+        
+        # En modo binario cada byte se traduce con una tabla de 256 entradas;
+        # en modo texto cada carácter se busca entre los puntos de código ordenados
+        if modo == MODO_BINARIO:
+            traduccion = self._arreglos_traduccion(self.codigos)
+            traducir = partial(self._traducir_bytes, traduccion)
+        else:
+            puntos = np.array(sorted(ord(caracter) for caracter in self.codigos), dtype=np.uint32)
+            traduccion = self._arreglos_traduccion(
+                dict(enumerate(self.codigos[chr(punto)] for punto in puntos.tolist())))
+            traducir = partial(self._traducir_texto, puntos, traduccion)
+        
+        self._escribir_encabezado(salida, modo, cantidad_simbolos, relleno)
+        notificador.fase(FASE_CODIFICANDO)
+        self._escribir_codigos(salida, bloques, traducir)
+    
+    def _escribir_codigos(self, salida, bloques, traducir):
+        """
+        Traduce cada bloque a sus arreglos de códigos y longitudes y los
+        escribe empaquetados; el último byte se completa con ceros
+        """
+        escritor = EscritorBits(salida)
+        for bloque in bloques:
+            escritor.escribir_codigos(*traducir(bloque))
+        escritor.cerrar()
+    
+    def _arreglos_traduccion(self, codigos):
+        """
+        Convierte {indice: (codigo, longitud)} con índices enteros en dos
+        arreglos de al menos 256 posiciones, para traducir bloques de forma vectorizada
+        """
+        tamano = max(codigos) + 1 if codigos else 0
+        codigos_valor = np.zeros(max(tamano, TAMANO_ALFABETO_BINARIO), dtype=np.uint64)
+        longitudes_valor = np.zeros(len(codigos_valor), dtype=np.uint8)
+        for valor, (codigo, longitud) in codigos.items():
+            codigos_valor[valor] = codigo
+            longitudes_valor[valor] = longitud
+        return codigos_valor, longitudes_valor
+    
+    def _traducir_bytes(self, traduccion, bloque):
+        """Devuelve los códigos y longitudes de cada byte del bloque"""
+        valores = np.frombuffer(memoryview(bloque), dtype=np.uint8)
+        return traduccion[0][valores], traduccion[1][valores]
+    
+    def _traducir_texto(self, puntos, traduccion, bloque):
+        """Devuelve los códigos y longitudes de cada carácter del bloque"""
+        indices = np.searchsorted(puntos, np.frombuffer(bloque.encode('utf-32-le'), dtype='<u4'))
+        return traduccion[0][indices], traduccion[1][indices]
+    
+    def _abrir_entrada(self, archivo_entrada, modo):
+        """
+        Abre el archivo de entrada como texto UTF-8 o como bytes según el modo.
+        Los saltos de línea se leen sin traducir para restaurarlos tal cual.
+        """
+        if modo == MODO_BINARIO:
+            return open(archivo_entrada, 'rb')
+        return open(archivo_entrada, 'r', encoding='utf-8', newline='')
+    
+    def _leer_bloques(self, archivo, modo, notificador):
+        """
+        Genera el contenido del archivo en bloques de TAMANO_BLOQUE e informa
+        los bytes leídos después de procesar cada bloque
+        """
+        if modo == MODO_BINARIO:
+            vacio, posicion = b"", archivo.tell
+        else:
+            # En modo texto se mide sobre el archivo binario subyacente
+            vacio, posicion = "", archivo.buffer.tell
+        for bloque in iter(lambda: archivo.read(TAMANO_BLOQUE), vacio):
+            yield bloque
+            notificador.actualizar(posicion())
+    
+    def _contar_frecuencias(self, archivo_entrada, modo, notificador):
+        """
+        Cuenta la frecuencia de cada símbolo leyendo el archivo por bloques.
+        En modo binario se usa un histograma vectorizado de 256 posiciones.
+        """
+        if modo == MODO_BINARIO:
+            histograma = np.zeros(TAMANO_ALFABETO_BINARIO, dtype=np.int64)
+            with self._abrir_entrada(archivo_entrada, modo) as archivo:
+                for bloque in self._leer_bloques(archivo, modo, notificador):
+                    histograma += self._histograma_bytes(bloque)
+            return self._frecuencias_de_histograma(histograma)
+        
+        frecuencia = Counter()
+        with self._abrir_entrada(archivo_entrada, modo) as archivo:
+            for bloque in self._leer_bloques(archivo, modo, notificador):
+                frecuencia.update(bloque)
+        return frecuencia
+    
+    def _histograma_bytes(self, bloque):
+        """
+        Cuenta las apariciones de cada valor de byte con un histograma vectorizado
+        """
+        return np.bincount(np.frombuffer(memoryview(bloque), dtype=np.uint8),
+                           minlength=TAMANO_ALFABETO_BINARIO)
+    
+    def _frecuencias_de_histograma(self, histograma):
+        """
+        Convierte un histograma de 256 posiciones en {byte: frecuencia} sin los ceros
+        """
+        return {int(valor): int(histograma[valor]) for valor in np.flatnonzero(histograma)}
+    
+    def _escribir_encabezado(self, archivo, modo, cantidad_simbolos, relleno):
+        """
+        Escribe el encabezado del contenedor binario y la tabla de longitudes
+        """
+        archivo.write(struct.pack(FORMATO_ENCABEZADO, MAGIA, VERSION, CODIGOS_MODO[modo],
+                                  cantidad_simbolos, relleno, len(self.codigos)))
+        
+        # Con códigos canónicos basta guardar la longitud de cada símbolo
+        if modo == MODO_BINARIO:
+            archivo.write(bytes(self.codigos[valor][1] if valor in self.codigos else 0
+                                for valor in range(TAMANO_ALFABETO_BINARIO)))
+        else:
+            for caracter, (_, longitud) in self.codigos.items():
+                archivo.write(struct.pack(FORMATO_SIMBOLO, ord(caracter), longitud))
+    
+    def _asignar_codigos_canonicos(self, longitudes):
+        """
+        Asigna códigos Huffman canónicos a partir de la longitud de cada símbolo.
+        Devuelve {simbolo: (codigo, longitud)}
+        """
+        codigos = {}
+        codigo = 0
+        longitud_anterior = 0
+        for simbolo, longitud in sorted(longitudes.items(), key=lambda par: (par[1], par[0])):
+            codigo <<= longitud - longitud_anterior
+            codigos[simbolo] = (codigo, longitud)
+            codigo += 1
+            longitud_anterior = longitud
+        return codigos
+    
+    def _calcular_longitudes(self, frecuencia):
+        """
+        Calcula la longitud del código de cada símbolo, limitada a LONGITUD_MAXIMA bits.
+        Los símbolos se ordenan por valor, así que las longitudes no dependen
+        del orden en que se contaron; el árbol se construye con dos colas si
+        las frecuencias quedan ordenadas y con un montículo si no.
+        """
+        simbolos = sorted(frecuencia)
+        arbol = self._construir_arbol_huffman(simbolos, [frecuencia[simbolo] for simbolo in simbolos])
+        # Un texto con un único símbolo necesita al menos un bit por carácter
+        longitudes = {simbolo: max(profundidad, 1)
+                      for simbolo, profundidad in zip(simbolos, arbol.profundidades())}
+        # Con más de 2^LONGITUD_MAXIMA símbolos el límite no se puede cumplir
+        limite = max(LONGITUD_MAXIMA, (len(longitudes) - 1).bit_length())
+        return self._limitar_longitudes(longitudes, frecuencia, limite)
+    
+    def _construir_arbol_huffman(self, simbolos, pesos):
+        """
+        Construye el árbol de Huffman de los símbolos con sus pesos. Si los
+        pesos ya vienen ordenados se usa el método de dos colas, en O(n);
+        si no, un montículo con claves (peso, índice del nodo). En los dos
+        casos los empates se resuelven por orden de creación, así que el
+        árbol es siempre el mismo para la misma entrada.
+        """
+        arbol = ArbolHuffman(simbolos, pesos)
+        if all(anterior <= siguiente for anterior, siguiente in zip(pesos, pesos[1:])):
+            self._combinar_dos_colas(arbol)
+        else:
+            self._combinar_monticulo(arbol)
+        return arbol
+    
+    def _combinar_dos_colas(self, arbol):
+        """
+        Combina los nodos con dos colas: las hojas ordenadas por peso y los
+        nodos internos, que se crean ya ordenados. El mínimo siempre está al
+        frente de alguna de las dos; ante un empate se elige la hoja.
+        """
+        peso = arbol.peso
+        hojas = len(arbol.simbolos)
+        siguiente_hoja = 0
+        siguiente_interno = hojas
+        for _ in range(hojas - 1):
+            elegidos = []
+            for _ in range(2):
+                if siguiente_hoja < hojas and (siguiente_interno == len(peso)
+                                               or peso[siguiente_hoja] <= peso[siguiente_interno]):
+                    elegidos.append(siguiente_hoja)
+                    siguiente_hoja += 1
+                else:
+                    elegidos.append(siguiente_interno)
+                    siguiente_interno += 1
+            arbol.combinar(*elegidos)
+    
+    def _combinar_monticulo(self, arbol):
+        """Combina los nodos de menor peso usando un montículo de (peso, índice)"""
+        monticulo = list(zip(arbol.peso, range(len(arbol.peso))))
+        heapq.heapify(monticulo)
         while len(monticulo) > 1:
-            izquierda = heapq.heappop(monticulo)
-            derecha = heapq.heappop(monticulo)
+            _, izquierda = heapq.heappop(monticulo)
+            _, derecha = heapq.heappop(monticulo)
+            nodo = arbol.combinar(izquierda, derecha)
+            heapq.heappush(monticulo, (arbol.peso[nodo], nodo))
+    
+    def _limitar_longitudes(self, longitudes, frecuencia, limite):
+        """
+        Ajusta las longitudes para que ninguna supere el límite, conservando
+        un código prefijo completo (método del Anexo K de JPEG). Los símbolos
+        más frecuentes reciben las longitudes más cortas.
+        """
+        longitud_mayor = max(longitudes.values())
+        if longitud_mayor <= limite:
+            return longitudes
+        
+        cuenta = [0] * (longitud_mayor + 1)
+        for longitud in longitudes.values():
+            cuenta[longitud] += 1
+        
+        for i in range(longitud_mayor, limite, -1):
+            while cuenta[i] > 0:
+                # Subir un par de hojas y colgarlas de una hoja menos profunda
+                j = i - 2
+                while cuenta[j] == 0:
+                    j -= 1
+                cuenta[i] -= 2
+                cuenta[i - 1] += 1
+                cuenta[j + 1] += 2
+                cuenta[j] -= 1
+        
+        simbolos = sorted(longitudes, key=lambda simbolo: (-frecuencia[simbolo], simbolo))
+        limitadas = {}
+        posicion = 0
+        for longitud in range(1, limite + 1):
+            for simbolo in simbolos[posicion:posicion + cuenta[longitud]]:
+                limitadas[simbolo] = longitud
+            posicion += cuenta[longitud]
+        return limitadas
+    
+    # ======================================================
+    # DICCIONARIOS
+    # ======================================================
+    def entrenar_diccionario(self, archivos_muestra, identificador, progreso=None):
+        """
+        Construye una tabla de códigos con las frecuencias de bytes de los
+        archivos de muestra y la guarda con el identificador indicado (un
+        entero de 32 bits). Devuelve la ruta del diccionario.
+        """
+        try:
+            self._validar_identificador(identificador)
+            notificador = NotificadorProgreso(progreso, sum(os.path.getsize(archivo)
+                                                            for archivo in archivos_muestra))
+            notificador.fase(FASE_CONTANDO)
+            histograma = np.zeros(TAMANO_ALFABETO_BINARIO, dtype=np.int64)
+            leidos = 0
+            for archivo_muestra in archivos_muestra:
+                with open(archivo_muestra, 'rb') as archivo:
+                    for bloque in iter(lambda: archivo.read(TAMANO_BLOQUE), b""):
+                        histograma += self._histograma_bytes(bloque)
+                        leidos += len(bloque)
+                        notificador.actualizar(leidos)
+            frecuencia = self._frecuencias_de_histograma(histograma)
+            if not frecuencia:
+                raise ValueError("Las muestras están vacías")
+            
+            # El escape recibe la frecuencia mínima: solo se usa para bytes
+            # que no aparecieron en las muestras
+            notificador.fase(FASE_ARBOL)
+            frecuencia[SIMBOLO_ESCAPE] = 1
+            longitudes = self._calcular_longitudes(frecuencia)
+            tabla = bytes(longitudes.get(simbolo, 0) for simbolo in range(SIMBOLO_ESCAPE + 1))
+            
+            crear_directorio_si_no_existe(self.directorio_diccionarios)
+            ruta = self._ruta_diccionario(identificador)
+            with open(ruta, 'wb') as archivo:
+                archivo.write(struct.pack(FORMATO_ENCABEZADO_TABLA, MAGIA_TABLA, VERSION, identificador))
+                archivo.write(tabla)
+            self._diccionarios[identificador] = self._preparar_diccionario(tabla)
+            notificador.terminar()
+            
+            return ruta
+            
+        except OperacionCancelada:
+            raise
+        except Exception as e:
+            raise Exception(f"Error entrenando el diccionario: {e}")
+    
+    def comprimir_con_diccionario(self, archivo_entrada, identificador, progreso=None,
+                                  directorio_salida=None):
+        """
+        Comprime cualquier archivo con un diccionario ya entrenado, sin contar
+        frecuencias ni construir el árbol. El .bin solo guarda el identificador
+        del diccionario, que debe estar disponible para descomprimir.
+        """
+        try:
+            nombre_base = ruta_base_salida(archivo_entrada, directorio_salida)
+            archivo_salida = nombre_base + "_comprimido.bin"
+            tabla, traduccion, _, _ = self._cargar_diccionario(identificador)
+            
+            with compresion_con_cache(self.cache, archivo_entrada, archivo_salida, "huffman_diccionario",
+                                      tabla=tabla.hex(), identificador=identificador,
+                                      version=VERSION) as en_cache:
+                if en_cache:
+                    return archivo_salida
+                tamano_original = os.path.getsize(archivo_entrada)
+                notificador = NotificadorProgreso(progreso, tamano_original)
+                notificador.fase(FASE_CODIFICANDO)
+                
+                with open(archivo_entrada, 'rb') as entrada, salida_atomica(archivo_salida) as temporal, \
+                        open(temporal, 'wb') as salida:
+                    salida.write(struct.pack(FORMATO_ENCABEZADO_DICCIONARIO, MAGIA_DICCIONARIO, VERSION,
+                                             identificador, tamano_original))
+                    bloques = self._leer_bloques(entrada, MODO_BINARIO, notificador)
+                    self._escribir_codigos(salida, bloques, partial(self._traducir_bytes, traduccion))
+                notificador.terminar()
+                
+            return archivo_salida
             
-            nodo_combinado = NodoHuffman(None, izquierda.frecuencia + derecha.frecuencia)
-            nodo_combinado.izquierda = izquierda
-            nodo_combinado.derecha = derecha
+        except OperacionCancelada:
+            raise
+        except Exception as e:
+            raise Exception(f"Error en compresión con diccionario: {e}")
+    
+    def codificar_con_diccionario(self, datos, identificador):
+        """
+        Comprime bytes en memoria con un diccionario y devuelve el flujo .bin,
+        pensado para fragmentos cortos que no vale la pena escribir a disco
+        """
+        try:
+            _, traduccion, _, _ = self._cargar_diccionario(identificador)
+            return (struct.pack(FORMATO_ENCABEZADO_DICCIONARIO, MAGIA_DICCIONARIO, VERSION,
+                                identificador, len(datos))
+                    + empaquetar_codigos(*self._traducir_bytes(traduccion, datos)))
             
-            heapq.heappush(monticulo, nodo_combinado)
+        except Exception as e:
+            raise Exception(f"Error en compresión con diccionario: {e}")
+    
+    def decodificar_con_diccionario(self, datos):
+        """
+        Restaura los bytes originales de un flujo .bin comprimido con diccionario
+        """
+        try:
+            entrada = io.BytesIO(datos)
+            return b"".join(self._decodificar_con_diccionario(entrada, NotificadorProgreso()))
+            
+        except Exception as e:
+            raise Exception(f"Error en descompresión con diccionario: {e}")
+    
+    def _decodificar_con_diccionario(self, archivo, notificador):
+        """
+        Lee el encabezado de un flujo comprimido con diccionario y genera los
+        bytes decodificados por bloques
+        """
+        encabezado = archivo.read(struct.calcsize(FORMATO_ENCABEZADO_DICCIONARIO))
+        if len(encabezado) < struct.calcsize(FORMATO_ENCABEZADO_DICCIONARIO):
+            raise ValueError("El archivo no tiene un encabezado válido")
+        magia, version, identificador, cantidad_bytes = struct.unpack(FORMATO_ENCABEZADO_DICCIONARIO,
+                                                                      encabezado)
+        if magia != MAGIA_DICCIONARIO or version != VERSION:
+            raise ValueError("El archivo no es un .bin con diccionario compatible")
+        _, _, codigos, decodificacion = self._cargar_diccionario(identificador)
+        bloques = self._leer_bloques(archivo, MODO_BINARIO, notificador)
+        return self._decodificar(bloques, codigos, cantidad_bytes, decodificacion)
+    
+    def _validar_identificador(self, identificador):
+        if not isinstance(identificador, int) or not 0 <= identificador < 1 << 32:
+            raise ValueError(f"El identificador de diccionario debe ser un entero de 32 bits, "
+                             f"no {identificador!r}")
+    
+    def _ruta_diccionario(self, identificador):
+        return os.path.join(self.directorio_diccionarios, f"{identificador}{EXTENSION_DICCIONARIO}")
+    
+    def _cargar_diccionario(self, identificador):
+        """
+        Devuelve el diccionario preparado para codificar y decodificar,
+        leyéndolo del directorio de diccionarios la primera vez
+        """
+        diccionario = self._diccionarios.get(identificador)
+        if diccionario is not None:
+            return diccionario
+        
+        self._validar_identificador(identificador)
+        ruta = self._ruta_diccionario(identificador)
+        if not os.path.exists(ruta):
+            raise ValueError(f"No existe el diccionario {identificador} en "
+                             f"{self.directorio_diccionarios}")
+        with open(ruta, 'rb') as archivo:
+            encabezado = archivo.read(struct.calcsize(FORMATO_ENCABEZADO_TABLA))
+            tabla = archivo.read(SIMBOLO_ESCAPE + 1)
+        if (len(encabezado) < struct.calcsize(FORMATO_ENCABEZADO_TABLA)
+                or len(tabla) < SIMBOLO_ESCAPE + 1):
+            raise ValueError(f"El diccionario {identificador} está incompleto")
+        magia, version, identificador_tabla = struct.unpack(FORMATO_ENCABEZADO_TABLA, encabezado)
+        if magia != MAGIA_TABLA or version != VERSION or identificador_tabla != identificador:
+            raise ValueError(f"{ruta} no es un diccionario compatible")
         
-        return monticulo[0]
+        diccionario = self._preparar_diccionario(tabla)
+        self._diccionarios[identificador] = diccionario
+        return diccionario
     
-    def _generar_codigos(self, nodo, codigo_actual):
+    def _preparar_diccionario(self, tabla):
         """
-        Genera los códigos Huffman recursivamente
+        A partir de la longitud de cada símbolo arma los códigos de los 256
+        bytes: los que no tienen código propio usan el escape seguido del byte.
+        Devuelve la tabla, los arreglos de traducción de cada byte, los
+        códigos canónicos y la tabla de decodificación.
         """
-        if nodo is None:
-            return
+        canonicos = self._asignar_codigos_canonicos({simbolo: longitud for simbolo, longitud
+                                                     in enumerate(tabla) if longitud})
+        codigo_escape, longitud_escape = canonicos.pop(SIMBOLO_ESCAPE)
+        codigos = {}
+        for valor in range(TAMANO_ALFABETO_BINARIO):
+            if valor not in canonicos:
+                canonicos[valor] = ((codigo_escape << 8) | valor, longitud_escape + 8)
+            codigos[bytes((valor,))] = canonicos[valor]
+        return (tabla, self._arreglos_traduccion(canonicos), codigos,
+                self._construir_tabla_decodificacion(codigos))
+    
+    # ======================================================
+    # MODO ADAPTATIVO
+    # ======================================================
+    def comprimir_adaptativo(self, archivo_entrada, intervalo=INTERVALO_ADAPTATIVO, progreso=None,
+                             directorio_salida=None):
+        """
+        Comprime un archivo en modo adaptativo, leyéndolo una sola vez.
+        Sirve también para archivos que siguen creciendo mientras se leen.
+        """
+        try:
+            nombre_base = ruta_base_salida(archivo_entrada, directorio_salida)
+            archivo_salida = nombre_base + "_comprimido.bin"
+            
+            with compresion_con_cache(self.cache, archivo_entrada, archivo_salida, "huffman_adaptativo",
+                                      intervalo=intervalo, version=VERSION_ADAPTATIVO) as en_cache:
+                if en_cache:
+                    return archivo_salida
+                notificador = NotificadorProgreso(progreso, os.path.getsize(archivo_entrada))
+                
+                with open(archivo_entrada, 'rb') as entrada, salida_atomica(archivo_salida) as temporal, \
+                        open(temporal, 'wb') as salida:
+                    self._comprimir_flujo(entrada, salida, intervalo, notificador)
+                
+            return archivo_salida
+            
+        except OperacionCancelada:
+            raise
+        except Exception as e:
+            raise Exception(f"Error en compresión adaptativa: {e}")
+    
+    def comprimir_flujo(self, fuente, salida, intervalo=INTERVALO_ADAPTATIVO, progreso=None):
+        """
+        Comprime en modo adaptativo un flujo sin tamaño conocido. `fuente` es
+        un archivo abierto (tubería, socket, log que crece) o un iterable de
+        bloques bytes o str; `salida` es un archivo abierto en modo binario.
+        Cada bloque leído se codifica y se vacía enseguida, así el otro
+        extremo puede descomprimir en vivo. Devuelve los bytes leídos.
+        """
+        try:
+            return self._comprimir_flujo(fuente, salida, intervalo, NotificadorProgreso(progreso))
+            
+        except OperacionCancelada:
+            raise
+        except Exception as e:
+            raise Exception(f"Error en compresión adaptativa: {e}")
+    
+    def descomprimir_flujo(self, fuente, salida, progreso=None):
+        """
+        Descomprime un flujo adaptativo a medida que llega: `fuente` es un
+        archivo abierto o un iterable de bloques de bytes y `salida` un
+        archivo abierto en modo binario. Devuelve los bytes restaurados.
+        """
+        try:
+            return self._descomprimir_flujo(fuente, salida, NotificadorProgreso(progreso))
+            
+        except OperacionCancelada:
+            raise
+        except Exception as e:
+            raise Exception(f"Error en descompresión adaptativa: {e}")
+    
+    def _comprimir_flujo(self, fuente, salida, intervalo, notificador):
+        notificador.fase(FASE_CODIFICANDO)
+        codificador = CodificadorAdaptativo(salida, intervalo)
+        leidos = 0
+        for bloque in _bloques_de_fuente(fuente):
+            codificador.escribir(bloque)
+            codificador.vaciar()
+            leidos += len(bloque)
+            notificador.actualizar(leidos)
+        codificador.cerrar()
+        notificador.terminar()
+        return leidos
+    
+    def _descomprimir_flujo(self, fuente, salida, notificador):
+        decodificador = DecodificadorAdaptativo()
+        leidos = escritos = 0
+        for bloque in _bloques_de_fuente(fuente):
+            datos = decodificador.alimentar(bloque)
+            leidos += len(bloque)
+            if datos:
+                salida.write(datos)
+                escritos += len(datos)
+                if hasattr(salida, 'flush'):
+                    salida.flush()
+            notificador.actualizar(leidos)
+            if decodificador.terminado:
+                break
+        if not decodificador.terminado:
+            raise ValueError("Los datos comprimidos están incompletos")
+        return escritos
+    
+    # ======================================================
+    # DESCOMPRESIÓN
+    # ======================================================
+    def descomprimir(self, archivo_bin, procesos=None, progreso=None, directorio_salida=None):
+        """
+        Restaura el archivo original a partir de un archivo .bin. Los archivos
+        generados por comprimir_paralelo se decodifican también en paralelo.
+        La función `progreso` recibe EventoProgreso con los bytes comprimidos leídos.
+        """
+        try:
+            notificador = NotificadorProgreso(progreso, os.path.getsize(archivo_bin))
+            notificador.fase(FASE_DECODIFICANDO)
+            with open(archivo_bin, 'rb') as archivo:
+                magia = archivo.read(len(MAGIA_BLOQUES))
+                archivo.seek(0)
+                nombre_base = ruta_base_salida(archivo_bin, directorio_salida)
+                
+                if magia == MAGIA_BLOQUES:
+                    archivo_salida = nombre_base + "_descomprimido.dat"
+                    with salida_atomica(archivo_salida) as temporal, open(temporal, 'wb') as salida:
+                        self._descomprimir_bloques(archivo, salida, procesos, notificador)
+                    notificador.terminar()
+                    return archivo_salida
+                
+                if magia == MAGIA_ADAPTATIVO:
+                    archivo_salida = nombre_base + "_descomprimido.dat"
+                    with salida_atomica(archivo_salida) as temporal, open(temporal, 'wb') as salida:
+                        self._descomprimir_flujo(archivo, salida, notificador)
+                    notificador.terminar()
+                    return archivo_salida
+                
+                if magia == MAGIA_DICCIONARIO:
+                    archivo_salida = nombre_base + "_descomprimido.dat"
+                    with salida_atomica(archivo_salida) as temporal, open(temporal, 'wb') as salida:
+                        for datos in self._decodificar_con_diccionario(archivo, notificador):
+                            salida.write(datos)
+                    notificador.terminar()
+                    return archivo_salida
+                
+                modo, cantidad_simbolos, codigos = self._leer_encabezado(archivo)
+                if modo == MODO_BINARIO:
+                    archivo_salida = nombre_base + "_descomprimido.dat"
+                    apertura = {'mode': 'wb'}
+                else:
+                    archivo_salida = nombre_base + "_descomprimido.txt"
+                    apertura = {'mode': 'w', 'encoding': 'utf-8', 'newline': ''}
+                with salida_atomica(archivo_salida) as temporal, open(temporal, **apertura) as salida:
+                    bloques = self._leer_bloques(archivo, MODO_BINARIO, notificador)
+                    for texto in self._decodificar(bloques, codigos, cantidad_simbolos):
+                        salida.write(texto)
+            notificador.terminar()
+            
+            return archivo_salida
+            
+        except OperacionCancelada:
+            raise
+        except Exception as e:
+            raise Exception(f"Error en descompresión de texto: {e}")
+    
+    def descomprimir_bloque(self, archivo_bin, numero_bloque):
+        """
+        Devuelve los bytes originales de un solo bloque de un archivo generado
+        por comprimir_paralelo, sin decodificar el resto
+        """
+        try:
+            with open(archivo_bin, 'rb') as archivo:
+                _, indice = self._leer_indice_bloques(archivo)
+                if not 0 <= numero_bloque < len(indice):
+                    raise ValueError(f"El archivo no tiene el bloque {numero_bloque}")
+                posicion, tamano_comprimido, _ = indice[numero_bloque]
+                archivo.seek(posicion)
+                return _descomprimir_bloque(archivo.read(tamano_comprimido))
+            
+        except Exception as e:
+            raise Exception(f"Error en descompresión de texto: {e}")
+    
+    def _leer_encabezado(self, archivo):
+        """
+        Lee el encabezado y la tabla de longitudes de un flujo .bin.
+        Devuelve el modo, la cantidad de símbolos codificados y los códigos canónicos.
+        """
+        encabezado = archivo.read(struct.calcsize(FORMATO_ENCABEZADO))
+        if len(encabezado) < struct.calcsize(FORMATO_ENCABEZADO):
+            raise ValueError("El archivo no tiene un encabezado válido")
+        magia, version, codigo_modo, cantidad_simbolos, relleno, simbolos_tabla = \
+            struct.unpack(FORMATO_ENCABEZADO, encabezado)
+        if magia != MAGIA or version != VERSION or codigo_modo not in CODIGOS_MODO.values():
+            raise ValueError("El archivo no es un .bin de Huffman compatible")
         
-        if nodo.caracter is not None:
-            self.codigos[nodo.caracter] = codigo_actual
-            return
+        longitudes = {}
+        if codigo_modo == CODIGOS_MODO[MODO_BINARIO]:
+            modo = MODO_BINARIO
+            # Cada símbolo se representa como un bytes de longitud 1
+            # para poder unir la salida con b"".join
+            tabla = archivo.read(TAMANO_ALFABETO_BINARIO)
+            for valor, longitud in enumerate(tabla):
+                if longitud:
+                    longitudes[bytes((valor,))] = longitud
+        else:
+            modo = MODO_TEXTO
+            tamano_simbolo = struct.calcsize(FORMATO_SIMBOLO)
+            for _ in range(simbolos_tabla):
+                punto, longitud = struct.unpack(FORMATO_SIMBOLO, archivo.read(tamano_simbolo))
+                longitudes[chr(punto)] = longitud
+        
+        return modo, cantidad_simbolos, self._asignar_codigos_canonicos(longitudes)
+    
+    def _leer_indice_bloques(self, archivo):
+        """
+        Lee el encabezado y el índice de un contenedor de bloques.
+        Devuelve el tamaño original y la lista de (posición, tamaño comprimido, tamaño original).
+        """
+        encabezado = archivo.read(struct.calcsize(FORMATO_ENCABEZADO_BLOQUES))
+        if len(encabezado) < struct.calcsize(FORMATO_ENCABEZADO_BLOQUES):
+            raise ValueError("El archivo no tiene un encabezado válido")
+        magia, version, tamano_original, _, cantidad_bloques = \
+            struct.unpack(FORMATO_ENCABEZADO_BLOQUES, encabezado)
+        if magia != MAGIA_BLOQUES or version != VERSION:
+            raise ValueError("El archivo no es un contenedor de bloques compatible")
+        
+        tamano_entrada = struct.calcsize(FORMATO_INDICE)
+        datos = archivo.read(tamano_entrada * cantidad_bloques)
+        indice = [struct.unpack_from(FORMATO_INDICE, datos, i * tamano_entrada)
+                  for i in range(cantidad_bloques)]
+        return tamano_original, indice
+    
+    def _descomprimir_bloques(self, archivo, salida, procesos, notificador):
+        """
+        Decodifica en paralelo los bloques de un contenedor y los escribe en orden
+        """
+        tamano_original, indice = self._leer_indice_bloques(archivo)
+        procesos = procesos or os.cpu_count() or 1
+        
+        def leer_bloques():
+            for posicion, tamano_comprimido, _ in indice:
+                archivo.seek(posicion)
+                yield archivo.read(tamano_comprimido)
+        
+        escritos = 0
+        with ProcessPoolExecutor(max_workers=procesos) as ejecutor:
+            for (posicion, tamano_comprimido, _), datos in zip(indice, mapear_en_orden(
+                    ejecutor, _descomprimir_bloque, leer_bloques(), 2 * procesos)):
+                salida.write(datos)
+                escritos += len(datos)
+                notificador.actualizar(posicion + tamano_comprimido)
+        
+        if escritos != tamano_original:
+            raise ValueError("Los datos comprimidos están incompletos")
+    
+    def _construir_tabla_decodificacion(self, codigos):
+        """
+        Construye la tabla de decodificación indexada por los siguientes
+        bits_tabla bits. Cada entrada guarda todos los símbolos que caben
+        completos en esos bits, los bits consumidos y la cantidad de símbolos.
+        Los códigos más largos que la tabla se resuelven aparte.
+        """
+        longitud_maxima = max(longitud for _, longitud in codigos.values())
+        # Los símbolos son str (modo texto) o bytes (modo binario)
+        vacio = next(iter(codigos))[:0]
+        bits_tabla = min(longitud_maxima, BITS_TABLA)
+        mascara = (1 << bits_tabla) - 1
         
-        self._generar_codigos(nodo.izquierda, codigo_actual + "0")
-        self._generar_codigos(nodo.derecha, codigo_actual + "1")
\ No newline at end of file
+        # Tabla de un símbolo por entrada
+        simple = [None] * (1 << bits_tabla)
+        largos = {}
+        for simbolo, (codigo, longitud) in codigos.items():
+            if longitud <= bits_tabla:
+                desplazamiento = bits_tabla - longitud
+                inicio = codigo << desplazamiento
+                for indice in range(inicio, inicio + (1 << desplazamiento)):
+                    simple[indice] = (simbolo, longitud)
+            else:
+                largos[(codigo, longitud)] = simbolo
+        
+        # Tabla de varios símbolos por entrada
+        tabla = [None] * (1 << bits_tabla)
+        for indice in range(1 << bits_tabla):
+            simbolos = []
+            consumidos = 0
+            while consumidos < bits_tabla:
+                entrada = simple[(indice << consumidos) & mascara]
+                if entrada is None or entrada[1] > bits_tabla - consumidos:
+                    break
+                simbolos.append(entrada[0])
+                consumidos += entrada[1]
+            if simbolos:
+                tabla[indice] = (vacio.join(simbolos), consumidos, len(simbolos))
+        
+        return tabla, bits_tabla, largos, longitud_maxima
+    
+    def _decodificar(self, bloques, codigos, cantidad_caracteres, decodificacion=None):
+        """
+        Decodifica los bits empaquetados consultando la tabla por bloques de
+        bits. Recibe los datos como un iterable de bloques de bytes y genera
+        los símbolos decodificados de cada bloque, unidos como str o bytes.
+        `decodificacion` es la tabla ya construida, si se reutiliza.
+        """
+        if decodificacion is None:
+            decodificacion = self._construir_tabla_decodificacion(codigos)
+        tabla, bits_tabla, largos, longitud_maxima = decodificacion
+        vacio = next(iter(codigos))[:0]
+        
+        lector = LectorBits(bloques)
+        resolver = partial(self._decodificar_codigo_largo, bits_tabla=bits_tabla,
+                           longitud_maxima=longitud_maxima, largos=largos)
+        restantes = cantidad_caracteres
+        while restantes > 0:
+            salida, cantidad = lector.decodificar_tabla(tabla, bits_tabla, min(restantes, TAMANO_BLOQUE),
+                                                        resolver)
+            restantes -= cantidad
+            
+            # Pasado el final se leen ceros: solo la última entrada de la tabla
+            # puede tomar algunos como símbolos del relleno
+            if lector.bits_leidos - lector.bits_disponibles >= bits_tabla:
+                raise ValueError("Los datos comprimidos están incompletos")
+            texto = vacio.join(salida)
+            yield texto[:len(texto) + restantes] if restantes < 0 else texto
+    
+    def _decodificar_codigo_largo(self, lector, bits_tabla, longitud_maxima, largos):
+        """
+        Resuelve un código más largo que la tabla probando cada longitud posible
+        """
+        for longitud in range(bits_tabla + 1, longitud_maxima + 1):
+            codigo = lector.ver(longitud)
+            simbolo = largos.get((codigo, longitud))
+            if simbolo is not None:
+                return simbolo, longitud, 1
+        raise ValueError("Código Huffman inválido en los datos comprimidos")
+
+
+
+def _comprimir_bloque(datos):
+    """
+    Comprime un bloque de bytes como un flujo .bin independiente en modo binario.
+    Devuelve el flujo y el tamaño original del bloque.
+    """
+    compresor = CompresorTexto()
+    frecuencia = compresor._frecuencias_de_histograma(compresor._histograma_bytes(datos))
+    salida = io.BytesIO()
+    compresor._codificar_flujo(salida, frecuencia, MODO_BINARIO, [datos], NotificadorProgreso())
+    return salida.getvalue(), len(datos)
+
+
+def _descomprimir_bloque(datos):
+    """
+    Decodifica un flujo .bin independiente y devuelve sus bytes originales
+    """
+    compresor = CompresorTexto()
+    entrada = io.BytesIO(datos)
+    _, cantidad_simbolos, codigos = compresor._leer_encabezado(entrada)
+    bloques = iter(lambda: entrada.read(TAMANO_BLOQUE), b"")
+    return b"".join(compresor._decodificar(bloques, codigos, cantidad_simbolos))
+
+
+def _bloques_de_fuente(fuente):
+    """
+    Genera los bloques de un archivo abierto o de un iterable de bloques.
+    De los archivos se lee con read1 si existe, que devuelve lo disponible
+    sin esperar a llenar el bloque.
+    """
+    if not hasattr(fuente, 'read'):
+        yield from fuente
+        return
+    leer = getattr(fuente, 'read1', fuente.read)
+    while True:
+        bloque = leer(TAMANO_BLOQUE)
+        if not bloque:
+            return
+        yield bloque
+
+
+class ModeloAdaptativo:
+    """
+    Frecuencias y códigos del modo adaptativo. El codificador y el
+    decodificador registran los mismos segmentos en el mismo orden, así que
+    reconstruyen exactamente la misma tabla sin transmitirla.
+    """
+    def __init__(self, intervalo):
+        if intervalo < 1:
+            raise ValueError("El intervalo de reconstrucción debe ser mayor o igual a 1")
+        self.intervalo = intervalo
+        # Todos los bytes empiezan con frecuencia 1: la primera tabla es uniforme
+        self.histograma = np.ones(TAMANO_ALFABETO_BINARIO, dtype=np.int64)
+        self.sin_registrar = 0
+        self._compresor = CompresorTexto()
+        self._longitudes = None
+        self._reconstruir()
+    
+    def registrar(self, segmento):
+        """Suma las frecuencias de un segmento y reconstruye la tabla si corresponde"""
+        self.histograma += self._compresor._histograma_bytes(segmento)
+        self.sin_registrar += len(segmento)
+        if self.sin_registrar >= self.intervalo:
+            self.sin_registrar = 0
+            if self.histograma.sum() > MAXIMO_FRECUENCIAS_ADAPTATIVO:
+                self.histograma = np.maximum(self.histograma >> 1, 1)
+            self._reconstruir()
+    
+    @property
+    def decodificacion(self):
+        """Tabla de decodificación de los códigos actuales, construida al usarla"""
+        if self._decodificacion is None:
+            self._decodificacion = self._compresor._construir_tabla_decodificacion(self.codigos)
+        return self._decodificacion
+    
+    def _reconstruir(self):
+        frecuencia = {valor: int(freq) for valor, freq in enumerate(self.histograma)}
+        longitudes = self._compresor._calcular_longitudes(frecuencia)
+        # Con contenido estable las longitudes se repiten y las tablas sirven
+        if longitudes == self._longitudes:
+            return
+        self._longitudes = longitudes
+        canonicos = self._compresor._asignar_codigos_canonicos(longitudes)
+        self.traduccion = self._compresor._arreglos_traduccion(canonicos)
+        self.codigos = {bytes((valor,)): canonicos[valor] for valor in range(TAMANO_ALFABETO_BINARIO)}
+        self._decodificacion = None
+
+
+class CodificadorAdaptativo:
+    """
+    Codifica en modo adaptativo lo que se le va escribiendo. Lo escrito se
+    junta hasta tener `tamano_minimo` bytes y entonces se codifica en
+    segmentos; vaciar codifica lo pendiente aunque sea menos, para que el
+    otro extremo lo reciba enseguida. cerrar escribe lo pendiente y el
+    segmento final que marca el fin del flujo.
+    """
+    def __init__(self, salida, intervalo=INTERVALO_ADAPTATIVO, tamano_minimo=TAMANO_MINIMO_SEGMENTO):
+        self.salida = salida
+        self.modelo = ModeloAdaptativo(intervalo)
+        self.tamano_minimo = min(tamano_minimo, intervalo)
+        self._compresor = self.modelo._compresor
+        self._pendiente = bytearray()
+        salida.write(struct.pack(FORMATO_ENCABEZADO_ADAPTATIVO, MAGIA_ADAPTATIVO, VERSION_ADAPTATIVO,
+                                 intervalo))
+    
+    def escribir(self, datos):
+        """Agrega un bloque de bytes (los str se codifican en UTF-8)"""
+        if isinstance(datos, str):
+            datos = datos.encode('utf-8')
+        self._pendiente += datos
+        if len(self._pendiente) >= self.tamano_minimo:
+            self._codificar_pendiente()
+    
+    def vaciar(self):
+        """Codifica lo pendiente y vacía la salida si es un archivo"""
+        self._codificar_pendiente()
+        if hasattr(self.salida, 'flush'):
+            self.salida.flush()
+    
+    def cerrar(self):
+        """Codifica lo pendiente y escribe el segmento vacío que marca el fin del flujo"""
+        self._codificar_pendiente()
+        self.salida.write(codificar_varints([0]).tobytes())
+    
+    def _codificar_pendiente(self):
+        datos, self._pendiente = bytes(self._pendiente), bytearray()
+        # Los segmentos no superan el intervalo para que la tabla no se atrase
+        for inicio in range(0, len(datos), self.modelo.intervalo):
+            self._escribir_segmento(datos[inicio:inicio + self.modelo.intervalo])
+    
+    def _escribir_segmento(self, segmento):
+        comprimido = empaquetar_codigos(*self._compresor._traducir_bytes(self.modelo.traduccion, segmento))
+        self.salida.write(codificar_varints([len(segmento), len(comprimido)]).tobytes())
+        self.salida.write(comprimido)
+        self.modelo.registrar(segmento)
+
+
+class DecodificadorAdaptativo:
+    """
+    Decodificador incremental del modo adaptativo: recibe los datos
+    comprimidos en bloques de cualquier tamaño y devuelve los bytes de los
+    segmentos que ya llegaron completos
+    """
+    def __init__(self):
+        self.modelo = None
+        self.terminado = False
+        self._pendiente = bytearray()
+    
+    def alimentar(self, datos):
+        """Agrega datos comprimidos y devuelve los bytes que se pudieron decodificar"""
+        self._pendiente += datos
+        salida = []
+        while not self.terminado:
+            if self.modelo is None:
+                if not self._leer_encabezado():
+                    break
+                continue
+            tamanos = self._leer_tamanos_segmento()
+            if tamanos is None:
+                break
+            cantidad, tamano, tamano_encabezado = tamanos
+            if cantidad == 0:
+                del self._pendiente[:tamano_encabezado]
+                self.terminado = True
+                break
+            if len(self._pendiente) < tamano_encabezado + tamano:
+                break
+            comprimido = bytes(self._pendiente[tamano_encabezado:tamano_encabezado + tamano])
+            del self._pendiente[:tamano_encabezado + tamano]
+            segmento = b"".join(self.modelo._compresor._decodificar(
+                [comprimido], self.modelo.codigos, cantidad, self.modelo.decodificacion))
+            self.modelo.registrar(segmento)
+            salida.append(segmento)
+        return b"".join(salida)
+    
+    def _leer_encabezado(self):
+        tamano_encabezado = struct.calcsize(FORMATO_ENCABEZADO_ADAPTATIVO)
+        if len(self._pendiente) < tamano_encabezado:
+            return False
+        magia, version, intervalo = struct.unpack_from(FORMATO_ENCABEZADO_ADAPTATIVO, self._pendiente)
+        if magia != MAGIA_ADAPTATIVO or version != VERSION_ADAPTATIVO:
+            raise ValueError("Los datos no son un flujo adaptativo compatible")
+        del self._pendiente[:tamano_encabezado]
+        self.modelo = ModeloAdaptativo(intervalo)
+        return True
+    
+    def _leer_tamanos_segmento(self):
+        """
+        Devuelve (bytes originales, bytes comprimidos, tamaño del encabezado)
+        del próximo segmento, o None si su encabezado todavía no llegó completo
+        """
+        # Basta mirar los primeros bytes: el encabezado son dos varint
+        leido = leer_varints(self._pendiente[:LARGO_MAXIMO_VARINT], 1)
+        if leido is None:
+            return None
+        (cantidad,), posicion = leido
+        if cantidad == 0:
+            return 0, 0, posicion
+        leido = leer_varints(self._pendiente[:2 * LARGO_MAXIMO_VARINT], 2)
+        if leido is None:
+            return None
+        (cantidad, tamano), posicion = leido
+        return int(cantidad), int(tamano), posicion
@@ -0,0 +1,283 @@
+# consola.py
+import argparse
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from compresor_texto import CompresorTexto, MODO_TEXTO, CODIGOS_MODO
+from compresor_imagenes import CompresorImagenes
+from compresor_audio import (CompresorAudio, MODO_REDUCCION, MODO_SIN_PERDIDA, MODO_PROFUNDIDAD,
+                             MODO_ADPCM)
+from cache_compresion import CacheCompresion, DIRECTORIO_CACHE, TAMANO_MAXIMO_CACHE
+from utilidades import (obtener_tamano_archivo, formatear_tamano, formatear_duracion,
+                        verificar_extension, crear_directorio_si_no_existe)
+
+# Tipo de archivo según la extensión, para comprimir y para descomprimir
+TIPO_TEXTO = "texto"
+TIPO_IMAGEN = "imagen"
+TIPO_AUDIO = "audio"
+
+EXTENSIONES_COMPRESION = {
+    TIPO_TEXTO: ('.txt',),
+    TIPO_IMAGEN: ('.png', '.bmp'),
+    TIPO_AUDIO: ('.wav', '.mp3'),
+}
+EXTENSIONES_DESCOMPRESION = {
+    TIPO_TEXTO: ('.bin',),
+    TIPO_IMAGEN: ('.rle',),
+    TIPO_AUDIO: ('.lac', '.adp'),
+}
+
+MODOS_AUDIO = (MODO_REDUCCION, MODO_SIN_PERDIDA, MODO_PROFUNDIDAD, MODO_ADPCM)
+BYTES_POR_MB = 1024 * 1024
+
+
+def _tipo_archivo(archivo, extensiones):
+    """Devuelve el tipo de archivo según su extensión, o None si no es compatible"""
+    for tipo, permitidas in extensiones.items():
+        if verificar_extension(archivo, permitidas):
+            return tipo
+    return None
+
+
+def _expandir_entradas(entradas, extensiones):
+    """
+    Expande los patrones glob (admite **) y los directorios de la lista de
+    entradas, conservando el orden y sin repetir archivos. Devuelve los
+    archivos compatibles y las entradas que no coincidieron con ninguno.
+    """
+    archivos = []
+    ignoradas = []
+    vistos = set()
+    for entrada in entradas:
+        coincidencias = sorted(glob.glob(entrada, recursive=True)) or [entrada]
+        encontrados = []
+        for ruta in coincidencias:
+            if os.path.isdir(ruta):
+                encontrados.extend(sorted(os.path.join(ruta, nombre) for nombre in os.listdir(ruta)))
+            elif os.path.isfile(ruta):
+                encontrados.append(ruta)
+        compatibles = [ruta for ruta in encontrados if _tipo_archivo(ruta, extensiones)]
+        if not compatibles:
+            ignoradas.append(entrada)
+        for ruta in compatibles:
+            clave = os.path.abspath(ruta)
+            if clave not in vistos:
+                vistos.add(clave)
+                archivos.append(ruta)
+    return archivos, ignoradas
+
+
+# Caché de cada proceso del grupo, reutilizada entre archivos para no
+# recorrer su directorio en cada tarea
+_caches = {}
+
+
+def _cache_del_proceso(directorio, tamano_maximo):
+    """Devuelve la caché de este proceso para el directorio, creándola la primera vez"""
+    cache = _caches.get((directorio, tamano_maximo))
+    if cache is None:
+        cache = _caches[(directorio, tamano_maximo)] = CacheCompresion(directorio, tamano_maximo)
+    cache.ultimo_acierto = None
+    return cache
+
+
+def _procesar_archivo(tarea):
+    """
+    Comprime o descomprime un archivo en un proceso del grupo. Cada archivo
+    se procesa con un solo proceso: el paralelismo está entre archivos.
+    Devuelve (archivo, salida, tamaño original, tamaño de salida, segundos,
+    si salió de la caché, error).
+    """
+    archivo, tipo, descomprimir, directorio_salida, opciones = tarea
+    inicio = time.perf_counter()
+    try:
+        cache = None
+        if opciones['cache'] is not None and not descomprimir:
+            cache = _cache_del_proceso(opciones['cache'], opciones['cache_maximo'])
+        if tipo == TIPO_TEXTO:
+            compresor = CompresorTexto(cache)
+            if descomprimir:
+                salida = compresor.descomprimir(archivo, procesos=1, directorio_salida=directorio_salida)
+            elif opciones['adaptativo']:
+                salida = compresor.comprimir_adaptativo(archivo, directorio_salida=directorio_salida)
+            elif opciones['diccionario'] is not None:
+                salida = compresor.comprimir_con_diccionario(archivo, opciones['diccionario'],
+                                                             directorio_salida=directorio_salida)
+            else:
+                salida = compresor.comprimir(archivo, opciones['modo_texto'],
+                                             directorio_salida=directorio_salida)
+        elif tipo == TIPO_IMAGEN:
+            compresor = CompresorImagenes(cache)
+            if descomprimir:
+                salida = compresor.descomprimir(archivo, hilos=1, directorio_salida=directorio_salida)
+            else:
+                salida = compresor.comprimir(archivo, directorio_salida=directorio_salida)
+        else:
+            compresor = CompresorAudio(cache)
+            if descomprimir:
+                salida = compresor.descomprimir(archivo, procesos=1, directorio_salida=directorio_salida)
+            else:
+                salida = compresor.comprimir(archivo, opciones['modo_audio'], opciones['bits'],
+                                             opciones['factor_muestreo'], procesos=1,
+                                             directorio_salida=directorio_salida)
+        segundos = time.perf_counter() - inicio
+        desde_cache = cache is not None and cache.ultimo_acierto is not None
+        return (archivo, salida, obtener_tamano_archivo(archivo), obtener_tamano_archivo(salida),
+                segundos, desde_cache, None)
+    except Exception as e:
+        return (archivo, None, obtener_tamano_archivo(archivo), 0, time.perf_counter() - inicio, False,
+                str(e))
+
+
+def _velocidad(tamano_bytes, segundos):
+    """Formatea la velocidad de procesamiento en bytes por segundo"""
+    if segundos <= 0:
+        return "-"
+    return f"{formatear_tamano(tamano_bytes / segundos)}/s"
+
+
+def _porcentaje(tamano_salida, tamano_original):
+    """Tamaño de salida como porcentaje del original"""
+    if not tamano_original:
+        return "-"
+    return f"{tamano_salida / tamano_original * 100:.1f}%"
+
+
+def _entrenar_diccionario(archivos, identificador):
+    """Entrena un diccionario con los archivos de texto de la lista"""
+    muestras = [archivo for archivo in archivos
+                if _tipo_archivo(archivo, EXTENSIONES_COMPRESION) == TIPO_TEXTO]
+    if not muestras:
+        print("No hay archivos de texto para entrenar el diccionario", file=sys.stderr)
+        return 1
+    try:
+        ruta = CompresorTexto().entrenar_diccionario(muestras, identificador)
+    except Exception as e:
+        print(f"ERROR {e}", file=sys.stderr)
+        return 1
+    print(f"Diccionario {identificador} entrenado con {len(muestras)} archivos "
+          f"({formatear_tamano(sum(map(obtener_tamano_archivo, muestras)))}): {ruta}")
+    return 0
+
+
+def _crear_parser():
+    parser = argparse.ArgumentParser(
+        description="Comprime archivos de texto (.txt), imágenes (.png, .bmp) y audio (.wav, .mp3) "
+                    "sin interfaz gráfica, varios archivos a la vez.")
+    parser.add_argument('entradas', nargs='+',
+                        help="archivos, directorios o patrones glob (use comillas para ** recursivo)")
+    parser.add_argument('-o', '--salida', default=None,
+                        help="directorio de salida (por defecto junto a cada archivo)")
+    parser.add_argument('-j', '--procesos', type=int, default=os.cpu_count() or 1,
+                        help="cantidad de archivos que se procesan a la vez (por defecto uno por núcleo)")
+    parser.add_argument('-d', '--descomprimir', action='store_true',
+                        help="descomprimir archivos .bin, .rle, .lac y .adp en lugar de comprimir")
+    parser.add_argument('--modo-texto', choices=tuple(CODIGOS_MODO), default=MODO_TEXTO,
+                        help="modo de Huffman para los .txt")
+    parser.add_argument('--adaptativo', action='store_true',
+                        help="comprimir los .txt con Huffman adaptativo, en una sola pasada")
+    parser.add_argument('--diccionario', type=int, default=None, metavar='ID',
+                        help="comprimir los .txt con un diccionario Huffman ya entrenado")
+    parser.add_argument('--entrenar-diccionario', type=int, default=None, metavar='ID',
+                        help="entrenar un diccionario Huffman con los .txt indicados y guardarlo "
+                             "como ID")
+    parser.add_argument('--modo-audio', choices=MODOS_AUDIO, default=MODO_REDUCCION,
+                        help="modo de compresión para los .wav")
+    parser.add_argument('--bits', type=int, default=None,
+                        help="bits por muestra en los modos de audio profundidad y adpcm")
+    parser.add_argument('--cache', nargs='?', const=DIRECTORIO_CACHE, default=None,
+                        help=f"reutilizar resultados de archivos ya comprimidos con los mismos "
+                             f"parámetros (directorio por defecto: {DIRECTORIO_CACHE})")
+    parser.add_argument('--cache-maximo', type=int, default=TAMANO_MAXIMO_CACHE // BYTES_POR_MB,
+                        help="tamaño máximo de la caché en MB; se descartan los resultados usados "
+                             "hace más tiempo")
+    parser.add_argument('--factor-muestreo', type=int, default=1,
+                        help="divisor de la frecuencia de muestreo en los modos de audio con pérdida")
+    return parser
+
+
+def main(argumentos=None):
+    """
+    Punto de entrada de consola: procesa los archivos en un grupo de procesos
+    e imprime una línea por archivo y un resumen total. Devuelve 1 si algún
+    archivo falló.
+    """
+    args = _crear_parser().parse_args(argumentos)
+    if args.procesos < 1:
+        print("La cantidad de procesos debe ser mayor o igual a 1", file=sys.stderr)
+        return 2
+
+    extensiones = EXTENSIONES_DESCOMPRESION if args.descomprimir else EXTENSIONES_COMPRESION
+    archivos, ignoradas = _expandir_entradas(args.entradas, extensiones)
+    for entrada in ignoradas:
+        print(f"Ignorado (sin archivos compatibles): {entrada}", file=sys.stderr)
+    if not archivos:
+        print("No hay archivos para procesar", file=sys.stderr)
+        return 1
+    if args.entrenar_diccionario is not None:
+        return _entrenar_diccionario(archivos, args.entrenar_diccionario)
+    if args.salida:
+        crear_directorio_si_no_existe(args.salida)
+
+    opciones = {
+        'modo_texto': args.modo_texto,
+        'diccionario': args.diccionario,
+        'adaptativo': args.adaptativo,
+        'modo_audio': args.modo_audio,
+        'bits': args.bits,
+        'factor_muestreo': args.factor_muestreo,
+        'cache': args.cache,
+        'cache_maximo': args.cache_maximo * BYTES_POR_MB,
+    }
+    tareas = []
+    fallidos = 0
+    nombres_salida = set()
+    for archivo in archivos:
+        tipo = _tipo_archivo(archivo, extensiones)
+        # En un mismo directorio de salida dos archivos homónimos se pisarían
+        nombre = (tipo, os.path.splitext(os.path.basename(archivo))[0])
+        if args.salida and nombre in nombres_salida:
+            fallidos += 1
+            print(f"ERROR {archivo}: otro archivo ya genera la misma salida en {args.salida}",
+                  file=sys.stderr)
+            continue
+        nombres_salida.add(nombre)
+        tareas.append((archivo, tipo, args.descomprimir, args.salida, opciones))
+
+    total_original = total_salida = 0
+    desde_cache_total = 0
+    procesos = min(args.procesos, len(tareas)) or 1
+    inicio = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=procesos) as ejecutor:
+        futuros = [ejecutor.submit(_procesar_archivo, tarea) for tarea in tareas]
+        for futuro in as_completed(futuros):
+            (archivo, salida, tamano_original, tamano_salida, segundos, desde_cache,
+             error) = futuro.result()
+            if error is not None:
+                fallidos += 1
+                print(f"ERROR {archivo}: {error}", file=sys.stderr)
+                continue
+            total_original += tamano_original
+            total_salida += tamano_salida
+            desde_cache_total += desde_cache
+            print(f"{archivo} -> {salida}: {formatear_tamano(tamano_original)} -> "
+                  f"{formatear_tamano(tamano_salida)} ({_porcentaje(tamano_salida, tamano_original)}) "
+                  f"en {segundos:.2f} s, {_velocidad(tamano_original, segundos)}"
+                  f"{' (caché)' if desde_cache else ''}")
+    transcurrido = time.perf_counter() - inicio
+
+    print("=" * 60)
+    print(f"Archivos: {len(archivos) - fallidos} correctos, {fallidos} con error"
+          f"{f', {desde_cache_total} desde la caché' if args.cache else ''}")
+    print(f"Total: {formatear_tamano(total_original)} -> {formatear_tamano(total_salida)} "
+          f"({_porcentaje(total_salida, total_original)})")
+    print(f"Tiempo: {formatear_duracion(transcurrido)} ({transcurrido:.2f} s), "
+          f"{_velocidad(total_original, transcurrido)} con {procesos} procesos")
+    return 1 if fallidos else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+# ejecutor_tareas.py
+from concurrent.futures import ThreadPoolExecutor
+
+from progreso import OperacionCancelada
+
+# Cada cuánto se revisan las tareas terminadas desde el hilo de Tk
+INTERVALO_REVISION_MS = 100
+
+
+class Tarea:
+    """Una operación enviada al ejecutor, con sus funciones de respuesta"""
+    def __init__(self, descripcion, al_terminar, al_fallar, al_cancelar, al_progresar):
+        self.descripcion = descripcion
+        self.futuro = None
+        self.al_terminar = al_terminar
+        self.al_fallar = al_fallar
+        self.al_cancelar = al_cancelar
+        self.al_progresar = al_progresar
+        self.cancelada = False
+        # Último EventoProgreso recibido del hilo de trabajo y último entregado
+        self.progreso = None
+        self._progreso_entregado = None
+
+    def cancelar(self):
+        """
+        Cancela la tarea. Si todavía está en cola no llega a ejecutarse; si ya
+        está en curso se detiene en el próximo aviso de progreso
+        """
+        self.cancelada = True
+        self.futuro.cancel()
+
+    def informar_progreso(self, evento):
+        """
+        Función de progreso que recibe el compresor en el hilo de trabajo.
+        Solo guarda el evento; el hilo de Tk lo muestra en la próxima revisión.
+        """
+        if self.cancelada:
+            raise OperacionCancelada()
+        self.progreso = evento
+
+
+class EjecutorTareas:
+    """
+    Ejecuta las compresiones en hilos de fondo para que la interfaz no se
+    congele. Tk no admite llamadas desde otros hilos, así que las respuestas
+    de cada tarea se invocan desde el hilo de Tk revisando periódicamente
+    con root.after. Las funciones enviadas reciben el argumento `progreso`
+    de los compresores, que además permite cancelarlas en curso.
+    """
+    def __init__(self, root, hilos=1):
+        self.root = root
+        self.ejecutor = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix="compresion")
+        self.tareas = []
+        self._revision = None
+
+    def enviar(self, descripcion, funcion, *argumentos,
+               al_terminar=None, al_fallar=None, al_cancelar=None, al_progresar=None):
+        """
+        Encola funcion(*argumentos, progreso=...). Mientras corre se llama a
+        al_progresar con cada EventoProgreso nuevo; al terminar se llama a
+        al_terminar con el resultado, a al_fallar con la excepción o a
+        al_cancelar si se canceló
+        """
+        tarea = Tarea(descripcion, al_terminar, al_fallar, al_cancelar, al_progresar)
+        tarea.futuro = self.ejecutor.submit(funcion, *argumentos, progreso=tarea.informar_progreso)
+        self.tareas.append(tarea)
+        if self._revision is None:
+            self._revision = self.root.after(INTERVALO_REVISION_MS, self._revisar)
+        return tarea
+
+    def _revisar(self):
+        """Entrega las tareas terminadas y vuelve a programarse si quedan pendientes"""
+        self._revision = None
+        terminadas = [tarea for tarea in self.tareas if tarea.futuro.done()]
+        for tarea in terminadas:
+            self.tareas.remove(tarea)
+            self._entregar(tarea)
+
+        # El progreso se muestra a lo sumo una vez por revisión
+        for tarea in self.tareas:
+            if tarea.al_progresar and tarea.progreso is not tarea._progreso_entregado:
+                tarea._progreso_entregado = tarea.progreso
+                tarea.al_progresar(tarea.progreso)
+
+        if self.tareas:
+            self._revision = self.root.after(INTERVALO_REVISION_MS, self._revisar)
+
+    def _entregar(self, tarea):
+        """
+        Llama a la respuesta que corresponde según cómo terminó la tarea. Una
+        tarea cancelada cuando ya estaba por terminar puede haber terminado
+        bien: solo cuenta como cancelada si no llegó a ejecutarse o si se
+        detuvo con OperacionCancelada.
+        """
+        error = None if tarea.futuro.cancelled() else tarea.futuro.exception()
+        if tarea.futuro.cancelled() or isinstance(error, OperacionCancelada):
+            if tarea.al_cancelar:
+                tarea.al_cancelar()
+        elif error is not None:
+            if tarea.al_fallar:
+                tarea.al_fallar(error)
+        elif tarea.al_terminar:
+            tarea.al_terminar(tarea.futuro.result())
+
+    def cerrar(self):
+        """Cancela las tareas en cola y deja de revisar; no espera a la tarea en curso"""
+        for tarea in self.tareas:
+            tarea.cancelar()
+        if self._revision is not None:
+            self.root.after_cancel(self._revision)
+            self._revision = None
+        self.ejecutor.shutdown(wait=False, cancel_futures=True)
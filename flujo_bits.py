@@ -0,0 +1,302 @@
+# flujo_bits.py
+import numpy as np
+
+# Bits que se juntan en el acumulador del escritor antes de pasarlos al búfer
+BITS_ACUMULADOR = 64
+# Bytes que el lector agrega a su acumulador en cada carga (cuatro palabras
+# de BITS_ACUMULADOR bits: cargar menos seguido compensa el costo de cada carga)
+BYTES_CARGA = 4 * BITS_ACUMULADOR // 8
+# Bytes que se juntan en el búfer antes de escribirlos en el archivo
+TAMANO_BUFER = 1 << 16
+# Códigos que se expanden a bits por tanda al empaquetar, para acotar la memoria
+CODIGOS_POR_TANDA = 1 << 16
+# Bytes que ocupa como máximo un varint de 64 bits
+LARGO_MAXIMO_VARINT = 10
+
+
+def empaquetar_codigos(codigos, longitudes):
+    """
+    Empaqueta códigos de longitud variable uno detrás de otro, con el primer
+    bit como el más significativo, de forma vectorizada. `longitudes` es un
+    arreglo del mismo largo que `codigos` o un entero, con longitudes de 0 a
+    64 bits. El último byte se completa con ceros.
+    """
+    completos, resto, bits_resto = _empaquetar(codigos, longitudes)
+    if bits_resto:
+        completos += bytes((resto << (8 - bits_resto),))
+    return completos
+
+
+def desempaquetar_codigos(datos, cantidad, longitud):
+    """
+    Lee `cantidad` códigos de `longitud` bits seguidos (1 a 64 bits) y los
+    devuelve como un arreglo uint64, de forma vectorizada
+    """
+    if longitud == 0 or cantidad == 0:
+        return np.zeros(cantidad, dtype=np.uint64)
+    bits = np.unpackbits(np.frombuffer(datos, dtype=np.uint8))[:cantidad * longitud]
+    if len(bits) < cantidad * longitud:
+        raise ValueError("Los datos comprimidos están incompletos")
+    desplazamientos = np.arange(longitud - 1, -1, -1, dtype=np.uint64)
+    return np.bitwise_or.reduce(bits.reshape(cantidad, longitud).astype(np.uint64) << desplazamientos,
+                                axis=1)
+
+
+def codificar_varints(numeros):
+    """
+    Codifica enteros no negativos en varint (7 bits por byte, el bit alto
+    indica que sigue otro byte), de forma vectorizada
+    """
+    numeros = np.asarray(numeros, dtype=np.uint64)
+    # Bytes que necesita cada número
+    cantidad = np.ones(len(numeros), dtype=np.int64)
+    resto = numeros >> np.uint64(7)
+    while resto.any():
+        cantidad += resto > 0
+        resto >>= np.uint64(7)
+
+    fin = np.cumsum(cantidad)
+    inicio = fin - cantidad
+    salida = np.empty(int(fin[-1]) if len(fin) else 0, dtype=np.uint8)
+    resto = numeros.copy()
+    for k in range(int(cantidad.max()) if len(cantidad) else 0):
+        activos = cantidad > k
+        byte = (resto[activos] & np.uint64(0x7F)).astype(np.uint8)
+        byte[cantidad[activos] > k + 1] |= 0x80
+        salida[inicio[activos] + k] = byte
+        resto >>= np.uint64(7)
+    return salida
+
+
+def leer_varints(datos, cantidad):
+    """
+    Lee los primeros `cantidad` enteros varint de `datos`, de forma
+    vectorizada. Devuelve (arreglo int64, bytes usados) o None si los datos
+    terminan antes que el último número.
+    """
+    if isinstance(datos, (bytes, bytearray, memoryview)):
+        datos = np.frombuffer(datos, dtype=np.uint8)
+    if cantidad == 0:
+        return np.zeros(0, dtype=np.int64), 0
+    fines = np.flatnonzero(datos < 0x80)[:cantidad]
+    if len(fines) < cantidad:
+        # El número que quedó abierto todavía puede completarse si es corto
+        abierto = len(datos) - (int(fines[-1]) + 1 if len(fines) else 0)
+        if abierto >= LARGO_MAXIMO_VARINT:
+            raise ValueError("Varint inválido en los datos comprimidos")
+        return None
+    usados = int(fines[-1]) + 1
+    inicios = np.concatenate(([0], fines[:-1] + 1))
+    if (fines - inicios).max() >= LARGO_MAXIMO_VARINT:
+        raise ValueError("Varint inválido en los datos comprimidos")
+    # Número al que pertenece cada byte y su posición dentro del número
+    numero = np.repeat(np.arange(cantidad), fines - inicios + 1)
+    posicion = np.arange(usados) - inicios[numero]
+    aportes = (datos[:usados] & 0x7F).astype(np.uint64) << (np.uint64(7) * posicion.astype(np.uint64))
+    return np.bitwise_or.reduceat(aportes, inicios).astype(np.int64), usados
+
+
+def _empaquetar(codigos, longitudes):
+    """
+    Empaqueta los códigos y devuelve (bytes completos, valor de los bits
+    que sobran, cantidad de bits que sobran)
+    """
+    codigos = np.asarray(codigos, dtype=np.uint64)
+    longitudes = np.broadcast_to(np.asarray(longitudes, dtype=np.int64), codigos.shape)
+    if len(codigos) == 0:
+        return b"", 0, 0
+
+    tandas = []
+    for inicio in range(0, len(codigos), CODIGOS_POR_TANDA):
+        tanda = codigos[inicio:inicio + CODIGOS_POR_TANDA]
+        longitudes_tanda = longitudes[inicio:inicio + CODIGOS_POR_TANDA]
+        ancho = int(longitudes_tanda.max())
+        if ancho == 0:
+            continue
+        # Alinear cada código a la izquierda de `ancho` bits y quedarse con
+        # sus primeros `longitud` bits, fila por fila
+        alineados = tanda << (ancho - longitudes_tanda).astype(np.uint64)
+        desplazamientos = np.arange(ancho - 1, -1, -1, dtype=np.uint64)
+        bits = ((alineados[:, None] >> desplazamientos) & np.uint64(1)).astype(np.uint8)
+        tandas.append(bits[np.arange(ancho) < longitudes_tanda[:, None]])
+    if not tandas:
+        return b"", 0, 0
+
+    bits = np.concatenate(tandas)
+    completos = len(bits) - len(bits) % 8
+    resto = 0
+    for bit in bits[completos:].tolist():
+        resto = (resto << 1) | bit
+    return np.packbits(bits[:completos]).tobytes(), resto, len(bits) - completos
+
+
+class EscritorBits:
+    """
+    Escribe códigos de bits en un archivo abierto en modo binario. Los bits
+    se juntan en un acumulador de BITS_ACUMULADOR bits que se vuelca de a
+    bytes completos a un búfer, y el búfer se escribe al llenarse.
+    """
+    def __init__(self, salida, tamano_bufer=TAMANO_BUFER):
+        self.salida = salida
+        self.tamano_bufer = tamano_bufer
+        self.bits_escritos = 0
+        self._acumulador = 0
+        self._bits = 0
+        self._bufer = bytearray()
+
+    def escribir(self, codigo, longitud):
+        """Agrega los `longitud` bits bajos de `codigo` (como mucho 64)"""
+        self._acumulador = (self._acumulador << longitud) | (codigo & ((1 << longitud) - 1))
+        self._bits += longitud
+        self.bits_escritos += longitud
+        if self._bits >= BITS_ACUMULADOR:
+            self._volcar_acumulador()
+
+    def escribir_codigos(self, codigos, longitudes):
+        """
+        Agrega un arreglo de códigos empaquetándolos de forma vectorizada; de
+        cada código se toman sus `longitud` bits bajos, como en escribir
+        """
+        codigos = np.asarray(codigos, dtype=np.uint64)
+        longitudes = np.broadcast_to(np.asarray(longitudes, dtype=np.int64), codigos.shape)
+        # Los bits sueltos del acumulador van como primer código
+        self._volcar_acumulador()
+        completos, resto, bits_resto = _empaquetar(
+            np.concatenate((np.array([self._acumulador], dtype=np.uint64), codigos)),
+            np.concatenate(([self._bits], longitudes)))
+        self.bits_escritos += int(longitudes.sum())
+        self._bufer += completos
+        self._acumulador, self._bits = resto, bits_resto
+        self._vaciar_si_lleno()
+
+    def alinear(self):
+        """Completa con ceros hasta el próximo byte"""
+        relleno = -self._bits % 8
+        if relleno:
+            self.escribir(0, relleno)
+
+    def vaciar(self):
+        """Escribe en el archivo los bytes completos; los bits sueltos quedan pendientes"""
+        self._volcar_acumulador()
+        if self._bufer:
+            self.salida.write(self._bufer)
+            self._bufer = bytearray()
+
+    def cerrar(self):
+        """Completa el último byte con ceros y escribe todo lo pendiente"""
+        self.alinear()
+        self.vaciar()
+
+    def _volcar_acumulador(self):
+        completos = self._bits // 8
+        if completos:
+            self._bits -= 8 * completos
+            self._bufer += (self._acumulador >> self._bits).to_bytes(completos, 'big')
+            self._acumulador &= (1 << self._bits) - 1
+            self._vaciar_si_lleno()
+
+    def _vaciar_si_lleno(self):
+        if len(self._bufer) >= self.tamano_bufer:
+            self.salida.write(self._bufer)
+            self._bufer = bytearray()
+
+
+class LectorBits:
+    """
+    Lee bits de un bloque de bytes o de un iterable de bloques, con el
+    primer bit como el más significativo. `ver` consulta los siguientes bits
+    sin avanzar y `consumir` avanza, como necesita la decodificación por
+    tabla. Pasado el final de los datos se leen ceros; `excedido` indica si
+    se consumieron más bits de los que había.
+    """
+    def __init__(self, datos):
+        if isinstance(datos, (bytes, bytearray, memoryview)):
+            datos = [datos]
+        self._bloques = iter(datos)
+        self._bloque = b""
+        self._posicion = 0
+        # El acumulador puede guardar bits ya consumidos por encima de los
+        # `_bits` pendientes; se descartan al cargar más
+        self._acumulador = 0
+        self._bits = 0
+        self._bits_cargados = 0
+        self.bits_disponibles = 0
+
+    @property
+    def bits_leidos(self):
+        return self._bits_cargados - self._bits
+
+    @property
+    def excedido(self):
+        return self.bits_leidos > self.bits_disponibles
+
+    def ver(self, cantidad):
+        """Devuelve los siguientes `cantidad` bits sin consumirlos"""
+        if self._bits < cantidad:
+            self._cargar(cantidad)
+        return (self._acumulador >> (self._bits - cantidad)) & ((1 << cantidad) - 1)
+
+    def consumir(self, cantidad):
+        """Descarta los siguientes `cantidad` bits, que ya se consultaron con ver"""
+        self._bits -= cantidad
+
+    def leer(self, cantidad):
+        """Devuelve los siguientes `cantidad` bits y los consume"""
+        valor = self.ver(cantidad)
+        self.consumir(cantidad)
+        return valor
+
+    def decodificar_tabla(self, tabla, bits_tabla, cantidad, resolver):
+        """
+        Decodifica con una tabla indexada por los siguientes `bits_tabla`
+        bits hasta obtener al menos `cantidad` valores. Cada entrada es
+        (valor, bits consumidos, cantidad de valores) y las entradas None se
+        resuelven con resolver(lector), que debe consultar con ver sin
+        consumir. Devuelve la lista de valores de cada entrada y la cantidad
+        de valores decodificados. Es el mismo ciclo que ver y consumir, con el
+        acumulador en variables locales.
+        """
+        valores = []
+        agregar = valores.append
+        mascara = (1 << bits_tabla) - 1
+        acumulador, bits = self._acumulador, self._bits
+        decodificados = 0
+        while decodificados < cantidad:
+            if bits < bits_tabla:
+                self._acumulador, self._bits = acumulador, bits
+                self._cargar(bits_tabla)
+                acumulador, bits = self._acumulador, self._bits
+            entrada = tabla[(acumulador >> (bits - bits_tabla)) & mascara]
+            if entrada is None:
+                self._acumulador, self._bits = acumulador, bits
+                entrada = resolver(self)
+                acumulador, bits = self._acumulador, self._bits
+            valor, consumidos, cantidad_valores = entrada
+            agregar(valor)
+            bits -= consumidos
+            decodificados += cantidad_valores
+        self._acumulador, self._bits = acumulador, bits
+        return valores, decodificados
+
+    def _cargar(self, cantidad):
+        """Agrega bytes al acumulador, de a BYTES_CARGA, hasta tener `cantidad` bits"""
+        acumulador = self._acumulador & ((1 << self._bits) - 1)
+        bits = self._bits
+        while bits < cantidad:
+            trozo = self._bloque[self._posicion:self._posicion + BYTES_CARGA]
+            if trozo:
+                self._posicion += len(trozo)
+                acumulador = (acumulador << (8 * len(trozo))) | int.from_bytes(trozo, 'big')
+                bits += 8 * len(trozo)
+                self._bits_cargados += 8 * len(trozo)
+                self.bits_disponibles += 8 * len(trozo)
+                continue
+            self._bloque = next(self._bloques, None)
+            self._posicion = 0
+            if self._bloque is None:
+                # Fin de los datos: se completa con ceros
+                self._bloque = b""
+                acumulador <<= 8 * BYTES_CARGA
+                bits += 8 * BYTES_CARGA
+                self._bits_cargados += 8 * BYTES_CARGA
+        self._acumulador, self._bits = acumulador, bits
@@ -4,7 +4,10 @@ import os
 from compresor_texto import CompresorTexto
 from compresor_imagenes import CompresorImagenes
 from compresor_audio import CompresorAudio
-from utilidades import obtener_tamano_archivo, formatear_tamano
+from ejecutor_tareas import EjecutorTareas
+from cache_compresion import CacheCompresion
+from progreso import NOMBRES_FASES
+from utilidades import obtener_tamano_archivo, formatear_tamano, formatear_duracion
 
 class InterfazCompresion:
     def __init__(self, root):
@@ -17,13 +20,27 @@ class InterfazCompresion:
         # Configurar estilo moderno
         self.configurar_estilos()
         
-        # Inicializar compresores
-        self.compresor_texto = CompresorTexto()
-        self.compresor_imagenes = CompresorImagenes()
-        self.compresor_audio = CompresorAudio()
+        # Inicializar compresores, compartiendo la caché de resultados
+        try:
+            cache = CacheCompresion()
+        except Exception:
+            # Sin un directorio de caché escribible se comprime siempre
+            cache = None
+        self.compresor_texto = CompresorTexto(cache)
+        self.compresor_imagenes = CompresorImagenes(cache)
+        self.compresor_audio = CompresorAudio(cache)
+        
+        # Las compresiones se ejecutan en segundo plano, una detrás de otra
+        self.ejecutor_tareas = EjecutorTareas(self.root)
+        self.root.protocol("WM_DELETE_WINDOW", self._al_cerrar)
         
         self.configurar_interfaz()
         
+    def _al_cerrar(self):
+        """Cancela las tareas pendientes y cierra la aplicación"""
+        self.ejecutor_tareas.cerrar()
+        self.root.destroy()
+        
     def configurar_estilos(self):
         """Configura estilos modernos para la interfaz"""
         style = ttk.Style()
@@ -140,17 +157,17 @@ class InterfazCompresion:
         
     def abrir_ventana_texto(self):
         """Abre la ventana para compresión de texto"""
-        ventana = VentanaCompresionTexto(self.root, self.compresor_texto)
+        ventana = VentanaCompresionTexto(self.root, self.compresor_texto, self.ejecutor_tareas)
         self._configurar_ventana_secundaria(ventana.ventana)
         
     def abrir_ventana_imagenes(self):
         """Abre la ventana para compresión de imágenes"""
-        ventana = VentanaCompresionImagenes(self.root, self.compresor_imagenes)
+        ventana = VentanaCompresionImagenes(self.root, self.compresor_imagenes, self.ejecutor_tareas)
         self._configurar_ventana_secundaria(ventana.ventana)
         
     def abrir_ventana_audio(self):
         """Abre la ventana para compresión de audio"""
-        ventana = VentanaCompresionAudio(self.root, self.compresor_audio)
+        ventana = VentanaCompresionAudio(self.root, self.compresor_audio, self.ejecutor_tareas)
         self._configurar_ventana_secundaria(ventana.ventana)
     
     def _configurar_ventana_secundaria(self, ventana):
@@ -160,7 +177,7 @@ class InterfazCompresion:
 
 class VentanaCompresionBase:
     """Clase base para ventanas de compresión"""
-    def __init__(self, parent, compresor, titulo, icono):
+    def __init__(self, parent, compresor, ejecutor, titulo, icono):
         self.ventana = tk.Toplevel(parent)
         self.ventana.title(f"{icono} {titulo}")
         self.ventana.geometry("500x500")
@@ -171,7 +188,9 @@ class VentanaCompresionBase:
         self.centrar_ventana()
         
         self.compresor = compresor
+        self.ejecutor = ejecutor
         self.archivo_original = ""
+        self.tareas = []
         
         self.configurar_interfaz()
         
@@ -180,6 +199,9 @@ class VentanaCompresionBase:
         
     def _al_cerrar(self):
         """Comportamiento cuando se cierra la ventana"""
+        # Las tareas de esta ventana ya no tienen dónde mostrar su resultado
+        for tarea in list(self.tareas):
+            tarea.cancelar()
         self.ventana.destroy()
         
     def centrar_ventana(self):
@@ -195,6 +217,108 @@ class VentanaCompresionBase:
         """Método abstracto para configurar la interfaz"""
         pass
         
+    def crear_controles_tareas(self, parent):
+        """
+        Crea la barra de progreso con la velocidad de la tarea en curso, la
+        etiqueta de tareas pendientes y el botón para cancelarlas
+        """
+        self.barra_progreso = ttk.Progressbar(parent, mode='determinate', maximum=100)
+        self.barra_progreso.pack(fill=tk.X, pady=(5, 0))
+        
+        self.label_progreso = tk.Label(parent, text="", bg='white', fg='#2c3e50')
+        self.label_progreso.pack()
+        
+        self.label_tareas = tk.Label(parent, text="", bg='white', fg='#7f8c8d')
+        self.label_tareas.pack()
+        
+        self.boton_cancelar = ttk.Button(parent,
+                                         text="⛔ Cancelar",
+                                         command=self.cancelar_tareas,
+                                         style='Moderno.TButton',
+                                         state='disabled')
+        self.boton_cancelar.pack(pady=5)
+        
+    def ejecutar_en_segundo_plano(self, descripcion, funcion, *argumentos, al_terminar, mensaje_error):
+        """
+        Encola funcion(*argumentos) en el ejecutor de tareas. Mientras tanto la
+        ventana sigue respondiendo y se pueden encolar más archivos.
+        """
+        def terminar(resultado):
+            self._quitar_tarea(tarea)
+            if self.ventana.winfo_exists():
+                al_terminar(resultado)
+        
+        def fallar(error):
+            self._quitar_tarea(tarea)
+            if self.ventana.winfo_exists():
+                messagebox.showerror("Error", f"❌ {mensaje_error}: {error}", parent=self.ventana)
+                self.label_resultados.config(text=f"❌ Error procesando {descripcion}")
+        
+        def cancelar():
+            self._quitar_tarea(tarea)
+            if self.ventana.winfo_exists():
+                self.label_resultados.config(text=f"⛔ Tarea cancelada: {descripcion}")
+        
+        def progresar(evento):
+            if self.ventana.winfo_exists():
+                self._mostrar_progreso(evento)
+        
+        tarea = self.ejecutor.enviar(descripcion, funcion, *argumentos,
+                                     al_terminar=terminar, al_fallar=fallar, al_cancelar=cancelar,
+                                     al_progresar=progresar)
+        self.tareas.append(tarea)
+        self._actualizar_estado_tareas()
+        return tarea
+        
+    def comprimir_en_segundo_plano(self, mensaje_espera, mensaje_error):
+        """Comprime el archivo seleccionado sin bloquear la ventana"""
+        archivo = self.archivo_original
+        nombre_archivo = os.path.basename(archivo)
+        self.label_resultados.config(text=f"⏳ {mensaje_espera}: {nombre_archivo}")
+        self.ejecutar_en_segundo_plano(nombre_archivo, self._comprimir_y_medir, archivo,
+                                       al_terminar=lambda resultado: self.mostrar_resultados(*resultado),
+                                       mensaje_error=mensaje_error)
+        
+    def _comprimir_y_medir(self, archivo, progreso):
+        """Se ejecuta en segundo plano: comprime y mide los tamaños"""
+        archivo_comprimido = self.compresor.comprimir(archivo, progreso=progreso)
+        return obtener_tamano_archivo(archivo), obtener_tamano_archivo(archivo_comprimido), archivo_comprimido
+        
+    def cancelar_tareas(self):
+        """Cancela las tareas pendientes de esta ventana"""
+        for tarea in list(self.tareas):
+            tarea.cancelar()
+        
+    def _quitar_tarea(self, tarea):
+        """Olvida una tarea terminada y actualiza el estado de la cola"""
+        if tarea in self.tareas:
+            self.tareas.remove(tarea)
+        if self.ventana.winfo_exists():
+            self.barra_progreso.config(value=0)
+            self.label_progreso.config(text="")
+            self._actualizar_estado_tareas()
+        
+    def _mostrar_progreso(self, evento):
+        """Muestra la fase, el porcentaje, la velocidad y el tiempo restante"""
+        partes = [NOMBRES_FASES.get(evento.fase, evento.fase or "")]
+        if evento.fraccion is not None:
+            self.barra_progreso.config(value=evento.fraccion * 100)
+            partes.append(f"{evento.fraccion:.0%}")
+        if evento.velocidad:
+            partes.append(f"{formatear_tamano(evento.velocidad)}/s")
+        if evento.eta is not None:
+            partes.append(f"quedan {formatear_duracion(evento.eta)}")
+        self.label_progreso.config(text=" · ".join(partes))
+        
+    def _actualizar_estado_tareas(self):
+        """Muestra cuántas tareas quedan y habilita el botón de cancelar"""
+        if self.tareas:
+            self.label_tareas.config(text=f"📋 Tareas pendientes: {len(self.tareas)}")
+            self.boton_cancelar.config(state='normal')
+        else:
+            self.label_tareas.config(text="")
+            self.boton_cancelar.config(state='disabled')
+        
     def seleccionar_archivo(self, tipos_archivo, titulo_dialogo):
         """Selecciona un archivo para comprimir"""
         try:
@@ -244,8 +368,8 @@ class VentanaCompresionBase:
             messagebox.showerror("Error", f"❌ No se pudieron calcular los resultados: {e}")
 
 class VentanaCompresionTexto(VentanaCompresionBase):
-    def __init__(self, parent, compresor):
-        super().__init__(parent, compresor, "Compresión de Texto", "📝")
+    def __init__(self, parent, compresor, ejecutor):
+        super().__init__(parent, compresor, ejecutor, "Compresión de Texto", "📝")
         
     def configurar_interfaz(self):
         main_frame = tk.Frame(self.ventana, bg='#ecf0f1', padx=30, pady=20)
@@ -295,6 +419,9 @@ class VentanaCompresionTexto(VentanaCompresionBase):
                                          state='disabled')
         self.boton_comprimir.pack(pady=20)
         
+        # Tareas en segundo plano
+        self.crear_controles_tareas(content_frame)
+        
         # Resultados
         self.label_resultados = tk.Label(content_frame, text="", bg='white', justify=tk.LEFT, wraplength=400)
         self.label_resultados.pack(pady=10, fill=tk.BOTH, expand=True)
@@ -304,24 +431,12 @@ class VentanaCompresionTexto(VentanaCompresionBase):
             messagebox.showwarning("Advertencia", "⚠️ Por favor seleccione un archivo .txt primero")
             return
             
-        try:
-            self.label_resultados.config(text="⏳ Comprimiendo archivo... Por favor espere.")
-            self.ventana.update()
-            
-            archivo_comprimido = self.compresor.comprimir(self.archivo_original)
-            tamano_original = obtener_tamano_archivo(self.archivo_original)
-            tamano_comprimido = obtener_tamano_archivo(archivo_comprimido)
-            
-            self.mostrar_resultados(tamano_original, tamano_comprimido, archivo_comprimido)
-            
-        except Exception as e:
-            messagebox.showerror("Error", f"❌ No se pudo comprimir el archivo: {e}")
-            self.label_resultados.config(text="❌ Error en la compresión")
+        self.comprimir_en_segundo_plano("Comprimiendo archivo", "No se pudo comprimir el archivo")
 
 
 class VentanaCompresionImagenes(VentanaCompresionBase):
-    def __init__(self, parent, compresor):
-        super().__init__(parent, compresor, "Compresión de Imágenes", "🖼️")
+    def __init__(self, parent, compresor, ejecutor):
+        super().__init__(parent, compresor, ejecutor, "Compresión de Imágenes", "🖼️")
 
     def configurar_interfaz(self):
         main_frame = tk.Frame(self.ventana, bg='#ecf0f1', padx=30, pady=20)
@@ -385,6 +500,9 @@ class VentanaCompresionImagenes(VentanaCompresionBase):
                                            style='Moderno.TButton')
         self.boton_visualizar.pack(pady=10)
 
+        # Tareas en segundo plano
+        self.crear_controles_tareas(content_frame)
+
         # Resultados
         self.label_resultados = tk.Label(content_frame, text="", bg='white', justify=tk.LEFT, wraplength=400)
         self.label_resultados.pack(pady=10, fill=tk.BOTH, expand=True)
@@ -394,19 +512,7 @@ class VentanaCompresionImagenes(VentanaCompresionBase):
             messagebox.showwarning("Advertencia", "⚠️ Por favor seleccione una imagen primero")
             return
 
-        try:
-            self.label_resultados.config(text="⏳ Comprimiendo imagen... Por favor espere.")
-            self.ventana.update()
-
-            archivo_comprimido = self.compresor.comprimir(self.archivo_original)
-            tamano_original = obtener_tamano_archivo(self.archivo_original)
-            tamano_comprimido = obtener_tamano_archivo(archivo_comprimido)
-
-            self.mostrar_resultados(tamano_original, tamano_comprimido, archivo_comprimido)
-
-        except Exception as e:
-            messagebox.showerror("Error", f"❌ No se pudo comprimir la imagen: {e}")
-            self.label_resultados.config(text="❌ Error en la compresión")
+        self.comprimir_en_segundo_plano("Comprimiendo imagen", "No se pudo comprimir la imagen")
 
     # -------------------- NUEVOS MÉTODOS --------------------
     def descomprimir(self):
@@ -418,18 +524,15 @@ class VentanaCompresionImagenes(VentanaCompresionBase):
         if not archivo:
             return
 
-        try:
-            self.label_resultados.config(text="⏳ Descomprimiendo imagen... Por favor espere.")
-            self.ventana.update()
+        self.label_resultados.config(text=f"⏳ Descomprimiendo imagen: {os.path.basename(archivo)}")
+        self.ejecutar_en_segundo_plano(os.path.basename(archivo), self.compresor.descomprimir, archivo,
+                                       al_terminar=self._mostrar_reconstruida,
+                                       mensaje_error="No se pudo descomprimir la imagen")
 
-            archivo_reconstruido = self.compresor.descomprimir(archivo)
-            # Actualizamos ultima salida y mostramos info
-            self.label_resultados.config(text=f"✅ Imagen reconstruida: {os.path.basename(archivo_reconstruido)}")
-            messagebox.showinfo("Éxito", f"🎉 Imagen reconstruida:\n{archivo_reconstruido}")
-
-        except Exception as e:
-            messagebox.showerror("Error", f"❌ No se pudo descomprimir la imagen: {e}")
-            self.label_resultados.config(text="❌ Error en la descompresión")
+    def _mostrar_reconstruida(self, archivo_reconstruido):
+        """Muestra la imagen reconstruida; el compresor ya actualizó su última salida"""
+        self.label_resultados.config(text=f"✅ Imagen reconstruida: {os.path.basename(archivo_reconstruido)}")
+        messagebox.showinfo("Éxito", f"🎉 Imagen reconstruida:\n{archivo_reconstruido}")
 
     def visualizar_imagen(self):
         """Abre la última imagen reconstruida en el visor del sistema."""
@@ -446,8 +549,8 @@ class VentanaCompresionImagenes(VentanaCompresionBase):
 
 
 class VentanaCompresionAudio(VentanaCompresionBase):
-    def __init__(self, parent, compresor):
-        super().__init__(parent, compresor, "Compresión de Audio", "🎵")
+    def __init__(self, parent, compresor, ejecutor):
+        super().__init__(parent, compresor, ejecutor, "Compresión de Audio", "🎵")
         
     def configurar_interfaz(self):
         main_frame = tk.Frame(self.ventana, bg='#ecf0f1', padx=30, pady=20)
@@ -497,6 +600,9 @@ class VentanaCompresionAudio(VentanaCompresionBase):
                                          state='disabled')
         self.boton_comprimir.pack(pady=20)
         
+        # Tareas en segundo plano
+        self.crear_controles_tareas(content_frame)
+        
         # Resultados
         self.label_resultados = tk.Label(content_frame, text="", bg='white', justify=tk.LEFT, wraplength=400)
         self.label_resultados.pack(pady=10, fill=tk.BOTH, expand=True)
@@ -506,16 +612,4 @@ class VentanaCompresionAudio(VentanaCompresionBase):
             messagebox.showwarning("Advertencia", "⚠️ Por favor seleccione un archivo de audio primero")
             return
             
-        try:
-            self.label_resultados.config(text="⏳ Comprimiendo audio... Por favor espere.")
-            self.ventana.update()
-            
-            archivo_comprimido = self.compresor.comprimir(self.archivo_original)
-            tamano_original = obtener_tamano_archivo(self.archivo_original)
-            tamano_comprimido = obtener_tamano_archivo(archivo_comprimido)
-            
-            self.mostrar_resultados(tamano_original, tamano_comprimido, archivo_comprimido)
-            
-        except Exception as e:
-            messagebox.showerror("Error", f"❌ No se pudo comprimir el audio: {e}")
-            self.label_resultados.config(text="❌ Error en la compresión")
\ No newline at end of file
+        self.comprimir_en_segundo_plano("Comprimiendo audio", "No se pudo comprimir el audio")
\ No newline at end of file
@@ -0,0 +1,113 @@
+# progreso.py
+import threading
+import time
+
+# Intervalo mínimo en segundos entre dos avisos de progreso, para que
+# informar el avance no frene los bucles de compresión
+INTERVALO_AVISOS = 0.1
+
+# Fases que informan los compresores
+FASE_CONTANDO = "contando"
+FASE_ARBOL = "arbol"
+FASE_CODIFICANDO = "codificando"
+FASE_ESCRIBIENDO = "escribiendo"
+FASE_DECODIFICANDO = "decodificando"
+
+NOMBRES_FASES = {
+    FASE_CONTANDO: "Contando frecuencias",
+    FASE_ARBOL: "Construyendo árbol",
+    FASE_CODIFICANDO: "Codificando",
+    FASE_ESCRIBIENDO: "Escribiendo",
+    FASE_DECODIFICANDO: "Decodificando",
+}
+
+
+class OperacionCancelada(Exception):
+    """La función de progreso pidió detener la operación en curso"""
+
+
+class EventoProgreso:
+    """Estado de una operación: fase, unidades procesadas y total de la fase"""
+    def __init__(self, fase, procesados, total, transcurrido):
+        self.fase = fase
+        self.procesados = procesados
+        self.total = total
+        self.transcurrido = transcurrido
+
+    @property
+    def fraccion(self):
+        """Parte completada de la fase, entre 0 y 1 (None si el total es desconocido)"""
+        if not self.total:
+            return None
+        return min(1.0, self.procesados / self.total)
+
+    @property
+    def velocidad(self):
+        """Unidades procesadas por segundo en la fase"""
+        if self.transcurrido <= 0:
+            return 0.0
+        return self.procesados / self.transcurrido
+
+    @property
+    def eta(self):
+        """Segundos estimados para terminar la fase (None si no se puede estimar)"""
+        if not self.total or not self.velocidad:
+            return None
+        return max(0.0, (self.total - self.procesados) / self.velocidad)
+
+
+class NotificadorProgreso:
+    """
+    Lleva la cuenta del avance de una operación y llama a la función de
+    progreso con un EventoProgreso como mucho una vez cada `intervalo`
+    segundos. Para cancelar, la función de progreso lanza OperacionCancelada.
+
+    Los compresores lo crean a partir del argumento `progreso` de sus
+    métodos públicos; sin función cada aviso se reduce a una suma.
+    """
+    def __init__(self, funcion=None, total=None, intervalo=INTERVALO_AVISOS):
+        self.funcion = funcion
+        self.total = total
+        self.intervalo = intervalo
+        self.fase_actual = None
+        self.procesados = 0
+        self._inicio = self._ultimo_aviso = time.monotonic()
+        # Las franjas de imagen avanzan desde varios hilos a la vez
+        self._candado = threading.Lock()
+
+    def fase(self, nombre, total=None):
+        """Empieza una fase nueva; sin total se conserva el de la operación"""
+        self.fase_actual = nombre
+        if total is not None:
+            self.total = total
+        self.procesados = 0
+        self._inicio = time.monotonic()
+        self._avisar()
+
+    def avanzar(self, cantidad):
+        """Suma `cantidad` unidades procesadas en la fase actual"""
+        with self._candado:
+            self.procesados += cantidad
+        self._avisar_si_corresponde()
+
+    def actualizar(self, procesados):
+        """Fija la cantidad total de unidades procesadas en la fase actual"""
+        self.procesados = procesados
+        self._avisar_si_corresponde()
+
+    def terminar(self):
+        """Marca la fase actual como completa y avisa sin esperar el intervalo"""
+        if self.total:
+            self.procesados = self.total
+        self._avisar()
+
+    def _avisar_si_corresponde(self):
+        if self.funcion is not None and time.monotonic() - self._ultimo_aviso >= self.intervalo:
+            self._avisar()
+
+    def _avisar(self):
+        if self.funcion is None:
+            return
+        ahora = time.monotonic()
+        self._ultimo_aviso = ahora
+        self.funcion(EventoProgreso(self.fase_actual, self.procesados, self.total, ahora - self._inicio))
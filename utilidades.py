@@ -1,5 +1,8 @@
 # utilidades.py
 import os
+import threading
+from collections import deque
+from contextlib import contextmanager
 
 def obtener_tamano_archivo(ruta_archivo):
     """
@@ -27,6 +30,19 @@ def formatear_tamano(tamano_bytes):
     
     return f"{tamano_bytes} B"
 
+def formatear_duracion(segundos):
+    """
+    Formatea una duración en segundos como "1 h 02 min", "3 min 05 s" o "12 s"
+    """
+    segundos = int(round(segundos))
+    horas, segundos = divmod(segundos, 3600)
+    minutos, segundos = divmod(segundos, 60)
+    if horas:
+        return f"{horas} h {minutos:02d} min"
+    if minutos:
+        return f"{minutos} min {segundos:02d} s"
+    return f"{segundos} s"
+
 def verificar_extension(archivo, extensiones_permitidas):
     """
     Verifica si un archivo tiene una extensión permitida
@@ -39,4 +55,44 @@ def crear_directorio_si_no_existe(ruta):
     Crea un directorio si no existe
     """
     if not os.path.exists(ruta):
-        os.makedirs(ruta)
\ No newline at end of file
+        os.makedirs(ruta, exist_ok=True)
+
+def ruta_base_salida(archivo, directorio_salida=None):
+    """
+    Devuelve la ruta sin extensión de los archivos generados a partir de
+    `archivo`: junto a él o, si se indica, dentro de directorio_salida
+    """
+    nombre_base = os.path.splitext(archivo)[0]
+    if directorio_salida is None:
+        return nombre_base
+    crear_directorio_si_no_existe(directorio_salida)
+    return os.path.join(directorio_salida, os.path.basename(nombre_base))
+
+@contextmanager
+def salida_atomica(archivo_salida):
+    """
+    Entrega una ruta temporal en el mismo directorio que archivo_salida y la
+    renombra a archivo_salida solo si el bloque termina sin errores. Si la
+    operación falla o se cancela, el temporal se borra y un resultado
+    anterior con el mismo nombre queda intacto.
+    """
+    temporal = f"{archivo_salida}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        yield temporal
+        os.replace(temporal, archivo_salida)
+    finally:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+
+def mapear_en_orden(ejecutor, funcion, elementos, ventana):
+    """
+    Aplica la función a cada elemento en el ejecutor y genera los resultados
+    en orden, con a lo sumo `ventana` tareas pendientes a la vez
+    """
+    pendientes = deque()
+    for elemento in elementos:
+        pendientes.append(ejecutor.submit(funcion, elemento))
+        if len(pendientes) >= ventana:
+            yield pendientes.popleft().result()
+    while pendientes:
+        yield pendientes.popleft().result()